@@ -0,0 +1,89 @@
+﻿# bench_due_dates.py
+"""
+截止日期缓存的性能对比
+
+生成一个包含 100k 个任务的 tasks.json，比较旧实现（每次循环都 strptime）
+与现在读取 Task.due 缓存的实现。
+
+运行: python benchmarks/bench_due_dates.py [任务数]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from data import save_tasks, load_tasks, get_task_stats, sort_tasks_by_date, search_tasks
+from generators import make_tasks, BASE_DATE
+
+# ---- 旧实现：每次调用都逐个 strptime ----
+
+def legacy_stats(tasks):
+    today = datetime.date.today()
+    overdue = upcoming = 0
+    for task in tasks:
+        if not task.get("completed") and task.get("due_date"):
+            due = datetime.datetime.strptime(task["due_date"], "%Y-%m-%d").date()
+            if due < today:
+                overdue += 1
+            elif (due - today).days <= 3:
+                upcoming += 1
+    return overdue, upcoming
+
+def legacy_sort_by_date(tasks):
+    def key(task):
+        if task.get("completed", False):
+            return datetime.date.max
+        if not task.get("due_date"):
+            return datetime.date.max
+        return datetime.datetime.strptime(task["due_date"], "%Y-%m-%d").date()
+    return sorted(tasks, key=key)
+
+def legacy_date_range(tasks, start, end):
+    results = []
+    for task in tasks:
+        if task.get("due_date"):
+            due = datetime.datetime.strptime(task["due_date"], "%Y-%m-%d").date()
+            if due < start or due > end:
+                continue
+        results.append(task)
+    return results
+
+def best_of(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    start, end = BASE_DATE - datetime.timedelta(days=7), BASE_DATE + datetime.timedelta(days=7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "tasks.json")
+        save_tasks(make_tasks(count), filename)
+
+        load_time = best_of(lambda: load_tasks(filename), repeat=1)
+        tasks = load_tasks(filename)
+        dicts = [task.to_dict() for task in tasks]
+
+    cases = [
+        ("get_task_stats", lambda: legacy_stats(dicts), lambda: get_task_stats(tasks)),
+        ("sort_tasks_by_date", lambda: legacy_sort_by_date(dicts), lambda: sort_tasks_by_date(tasks)),
+        ("search_tasks(date_range)", lambda: legacy_date_range(dicts, start, end),
+         lambda: search_tasks(tasks, "", date_range=(start, end))),
+    ]
+
+    print(f"任务数: {count}，加载（含解析截止日期）: {load_time * 1000:.1f} ms")
+    print(f"{'操作':<26}{'strptime (ms)':>16}{'缓存 (ms)':>14}{'加速比':>10}")
+    for name, legacy, cached in cases:
+        old = best_of(legacy)
+        new = best_of(cached)
+        print(f"{name:<26}{old * 1000:>16.1f}{new * 1000:>14.1f}{old / new:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
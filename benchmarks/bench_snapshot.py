@@ -0,0 +1,62 @@
+﻿# bench_snapshot.py
+"""
+JSON 快照与二进制快照的读写对比
+
+对每个任务数分别测量:
+- 保存: save_tasks(..., "json") 与 save_tasks(..., "binary")
+- 读取: load_task_index（JSON / 二进制，得到 Task 对象）
+- 映射: load_binary_snapshot（只映射文件，得到只读的 TaskTable）
+以及两种格式的文件大小。
+
+运行: python benchmarks/bench_snapshot.py [任务数 ...]（默认 10000 100000 1000000）
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from data import save_tasks, load_task_index
+from snapshot import load_binary_snapshot
+from generators import make_tasks
+
+def timed(func):
+    """返回 (func() 的结果, 耗时毫秒)"""
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+def bench(count, directory):
+    tasks = make_tasks(count)
+
+    json_file = os.path.join(directory, f"tasks_{count}.json")
+    binary_file = os.path.join(directory, f"tasks_{count}.bin")
+
+    _, json_save = timed(lambda: save_tasks(tasks, json_file, "json"))
+    _, binary_save = timed(lambda: save_tasks(tasks, binary_file, "binary"))
+    loaded, json_load = timed(lambda: load_task_index(json_file))
+    assert len(loaded) == count
+    loaded, binary_load = timed(lambda: load_task_index(binary_file))
+    assert len(loaded) == count
+    del loaded
+    table, binary_map = timed(lambda: load_binary_snapshot(binary_file))
+    assert len(table) == count
+    del table
+
+    return [
+        ("JSON", json_save, json_load, None, os.path.getsize(json_file)),
+        ("二进制", binary_save, binary_load, binary_map, os.path.getsize(binary_file)),
+    ]
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    print(f"{'任务数':>10}  {'格式':<8}{'保存 (ms)':>12}{'读取 (ms)':>12}{'映射 (ms)':>12}{'大小 (MB)':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in counts:
+            for name, save_ms, load_ms, map_ms, size in bench(count, directory):
+                mapped = f"{map_ms:>12.1f}" if map_ms is not None else f"{'-':>12}"
+                print(f"{count:>10}  {name:<8}{save_ms:>12.1f}{load_ms:>12.1f}{mapped}{size / 1024 / 1024:>12.2f}")
+
+if __name__ == "__main__":
+    main()
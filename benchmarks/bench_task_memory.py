@@ -0,0 +1,48 @@
+﻿# bench_task_memory.py
+"""
+任务模型的内存占用对比
+
+分别以 JSON 字典列表、Task 对象列表和列式 TaskTable 保存同一批任务，
+用 tracemalloc 统计每个任务平均占用的内存。
+
+运行: python benchmarks/bench_task_memory.py [任务数]
+"""
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from model import Task, TaskTable
+from generators import make_tasks
+
+def measure(build, payload):
+    """返回 build(payload) 的结果所占用的内存（字节）"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(payload)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # 以 JSON 文本为输入，与从 tasks.json 加载时的情况一致
+    payload = json.dumps([task.to_dict() for task in make_tasks(count)], ensure_ascii=False)
+
+    cases = [
+        ("dict", lambda text: json.loads(text)),
+        ("Task (__slots__)", lambda text: [Task.from_dict(item) for item in json.loads(text)]),
+        ("TaskTable", lambda text: TaskTable.from_dicts(json.loads(text))),
+    ]
+
+    print(f"任务数: {count}")
+    print(f"{'模型':<20}{'总计 (MB)':>12}{'每任务 (B)':>14}")
+    for name, build in cases:
+        size = measure(build, payload)
+        print(f"{name:<20}{size / 1024 / 1024:>12.1f}{size / count:>14.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+﻿# generators.py
+"""
+基准测试用的任务生成器
+
+生成接近真实使用情况的任务：中文为主、夹杂英文和数字的任务文本，
+优先级按 高 20% / 中 50% / 低 30% 分布，约 80% 带截止日期（以 base_date 为中心前后几个月），
+约 30% 已完成。相同的 count、seed 和 base_date 总是生成相同的任务。
+base_date 默认为固定的 BASE_DATE，不随运行日期变化，不同日期的测试结果可以相互比较。
+"""
+import datetime
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+
+from model import Task
+
+VERBS = ["完成", "整理", "提交", "复习", "准备", "修改", "阅读", "讨论", "检查", "预约", "购买", "回复", "更新", "测试"]
+SUBJECTS = ["软件工程", "操作系统", "计算机网络", "数据库", "编译原理", "高等数学", "线性代数", "大学英语",
+            "毕业设计", "实习", "社团活动", "健身计划", "项目"]
+OBJECTS = ["实验报告", "课程作业", "期中复习资料", "小组展示", "读书笔记", "会议纪要", "需求文档", "代码评审",
+           "周报", "演示文稿", "论文初稿", "面试材料", "报销单", "机票"]
+EXTRAS = ["", "", "", "（第{n}章）", "（第{n}周）", " v{n}", " #{n}", "，截止前发邮件给老师", " with TA", " PR#{n}",
+          "，记得带学生证", " (draft {n})"]
+
+PRIORITY_WEIGHTS = (("高", 20), ("中", 50), ("低", 30))
+
+# 截止日期围绕的默认日期
+BASE_DATE = datetime.date(2025, 1, 1)
+
+def make_text(rng):
+    """生成一条任务文本"""
+    extra = rng.choice(EXTRAS).format(n=rng.randint(1, 99))
+    return f"{rng.choice(VERBS)}{rng.choice(SUBJECTS)}{rng.choice(OBJECTS)}{extra}"
+
+def make_tasks(count, seed=0, base_date=None, with_ids=True):
+    """
+    生成 count 个任务
+
+    参数:
+    - seed: 随机数种子
+    - base_date: 截止日期围绕的日期（默认 BASE_DATE）
+    - with_ids: 是否按顺序分配 id（从 1 开始）
+    """
+    rng = random.Random(seed)
+    base = (base_date or BASE_DATE).toordinal()
+    priorities = [name for name, _ in PRIORITY_WEIGHTS]
+    weights = [weight for _, weight in PRIORITY_WEIGHTS]
+    due_dates = {}  # 日期序号 → 字符串，相同的日期只格式化一次
+
+    tasks = []
+    for i in range(count):
+        due_date = ""
+        if rng.random() < 0.8:
+            due = base + rng.randint(-90, 120)
+            due_date = due_dates.get(due)
+            if due_date is None:
+                due_date = due_dates[due] = datetime.date.fromordinal(due).isoformat()
+        task = Task(make_text(rng), rng.choices(priorities, weights)[0], rng.random() < 0.3, due_date,
+                    i + 1 if with_ids else None)
+        tasks.append(task)
+    return tasks
@@ -0,0 +1,219 @@
+﻿# run_benchmarks.py
+"""
+性能基准测试
+
+对每个任务数（默认 1000 10000 100000，可以加到 1000000）生成同一批任务（见 generators.py），
+测量以下操作的耗时，每项重复若干次取最小值和中位数:
+
+- load_tasks / save_tasks（JSON 快照）
+- search_tasks（关键词 / 日期范围）
+- sort_tasks_by_priority / sort_tasks_by_date
+- get_task_stats
+- export_tasks_as_text
+- engine_startup: TaskEngine 一次读入全部任务并建立索引
+- reload_tasks: 不带界面的刷新，即 ToDoAppUI.reload_tasks 中的数据部分
+  （按当前过滤和排序方式查询 + 读取状态栏统计）
+
+结果写入 JSON 文件（默认 benchmarks/results/bench_<时间>.json）。如果存在基准文件
+（默认 benchmarks/baseline.json），逐项与它比较，比基准慢超过 --threshold（默认 25%）
+且相差超过 --min-ms（默认 2 ms）的项标记为回归，此时返回值为 1。
+耗时与机器有关，基准应当在同一台机器上用 --save-baseline 生成。
+
+运行:
+    python benchmarks/run_benchmarks.py                      # 运行并与基准比较
+    python benchmarks/run_benchmarks.py --sizes 1000 1000000
+    python benchmarks/run_benchmarks.py --save-baseline      # 把本次结果保存为新的基准
+    python benchmarks/run_benchmarks.py --only sort          # 只运行名称包含 sort 的项
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "code"))
+
+from data import (load_tasks, save_tasks, search_tasks, sort_tasks_by_priority, sort_tasks_by_date,
+                  get_task_stats, export_tasks_as_text, JsonStorage)
+from config import ConfigService
+from engine import TaskEngine
+from generators import make_tasks, BASE_DATE
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+def measure(func, repeat):
+    """运行 func repeat 次，返回每次的耗时（毫秒）；与 timeit 一样计时期间关闭垃圾回收，减少波动"""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func()
+            times.append((time.perf_counter() - start) * 1000)
+        finally:
+            gc.enable()
+    return times
+
+def make_cases(tasks, directory):
+    """返回 [(名称, 函数)]，函数在临时目录 directory 中读写文件"""
+    # 日期范围与生成任务时使用同一个固定日期，每天运行时查询的选择性都相同
+    date_range = (BASE_DATE - datetime.timedelta(days=7), BASE_DATE + datetime.timedelta(days=7))
+    snapshot_file = os.path.join(directory, "tasks.json")
+    save_tasks(tasks, snapshot_file, "json")
+
+    config = ConfigService(os.path.join(directory, "config.json"))
+    engine = TaskEngine(config, JsonStorage(snapshot_file), auto_backup=False)
+
+    def reload_tasks():
+        engine.filter_tasks("未完成", order=("priority", False))
+        engine.stats()
+
+    reload_tasks()  # 有序视图在第一次按该方式排序时建立，之后的刷新才是常见情况
+
+    def engine_startup():
+        TaskEngine(config, JsonStorage(snapshot_file), auto_backup=False).close(final_backup=False)
+
+    cases = [
+        ("load_tasks", lambda: load_tasks(snapshot_file)),
+        ("save_tasks", lambda: save_tasks(tasks, os.path.join(directory, "saved.json"), "json")),
+        ("search_tasks(keyword)", lambda: search_tasks(tasks, "实验报告")),
+        ("search_tasks(date_range)", lambda: search_tasks(tasks, "", date_range=date_range)),
+        ("sort_tasks_by_priority", lambda: sort_tasks_by_priority(tasks)),
+        ("sort_tasks_by_date", lambda: sort_tasks_by_date(tasks)),
+        ("get_task_stats", lambda: get_task_stats(tasks)),
+        ("export_tasks_as_text", lambda: export_tasks_as_text(tasks, os.path.join(directory, "tasks.txt"))),
+        ("engine_startup", engine_startup),
+        ("reload_tasks", reload_tasks),
+    ]
+    return cases, engine
+
+def run(sizes, repeat, only=None, seed=0):
+    """运行全部测试，返回 {名称: {任务数: {"best_ms", "median_ms", "runs_ms"}}}"""
+    results = {}
+    for size in sizes:
+        tasks = make_tasks(size, seed)
+        runs = repeat if size < 1000000 else max(1, repeat // 3)  # 一百万个任务时少跑几次
+        with tempfile.TemporaryDirectory() as directory:
+            cases, engine = make_cases(tasks, directory)
+            try:
+                for name, func in cases:
+                    if only and not any(pattern in name for pattern in only):
+                        continue
+                    times = measure(func, runs)
+                    results.setdefault(name, {})[str(size)] = {
+                        "best_ms": round(min(times), 3),
+                        "median_ms": round(statistics.median(times), 3),
+                        "runs_ms": [round(t, 3) for t in times],
+                    }
+                    print(f"{name:<26}{size:>10}{min(times):>12.2f} ms", file=sys.stderr)
+            finally:
+                engine.close(final_backup=False)
+    return results
+
+def git_commit():
+    """当前的 git 提交，不在仓库中时返回 None"""
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+def environment():
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def compare(results, baseline, threshold, min_ms):
+    """与基准比较，返回 [(名称, 任务数, 本次, 基准, 变化比例, 标记)]"""
+    rows = []
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            base = baseline.get(name, {}).get(size)
+            if base is None:
+                rows.append((name, size, result["best_ms"], None, None, "新增"))
+                continue
+            current, previous = result["best_ms"], base["best_ms"]
+            change = (current - previous) / previous if previous > 0 else 0.0
+            mark = ""
+            if abs(current - previous) >= min_ms:
+                if change > threshold:
+                    mark = "回归"
+                elif change < -threshold:
+                    mark = "改进"
+            rows.append((name, size, current, previous, change, mark))
+    return rows
+
+def print_report(rows):
+    print(f"{'操作':<26}{'任务数':>10}{'本次 (ms)':>12}{'基准 (ms)':>12}{'变化':>10}  ")
+    for name, size, current, previous, change, mark in rows:
+        previous_text = f"{previous:>12.2f}" if previous is not None else f"{'-':>12}"
+        change_text = f"{change:>+10.1%}" if change is not None else f"{'-':>10}"
+        print(f"{name:<26}{size:>10}{current:>12.2f}{previous_text}{change_text}  {mark}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="YatToDo 性能基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="任务数（可以有多个）")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数，取最小值（默认 5）")
+    parser.add_argument("--seed", type=int, default=0, help="生成任务的随机数种子")
+    parser.add_argument("--only", nargs="+", help="只运行名称包含这些文字的项")
+    parser.add_argument("--output", help="结果文件（默认 benchmarks/results/bench_<时间>.json）")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基准文件（默认 benchmarks/baseline.json）")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基准")
+    parser.add_argument("--threshold", type=float, default=0.25, help="判定为回归的变慢比例（默认 0.25）")
+    parser.add_argument("--min-ms", type=float, default=2.0, help="相差小于该毫秒数时不判定（默认 2）")
+    args = parser.parse_args(argv)
+
+    report = {
+        "environment": environment(),
+        "settings": {"sizes": args.sizes, "repeat": args.repeat, "seed": args.seed},
+        "results": run(args.sizes, args.repeat, args.only, args.seed),
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, "bench_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}", file=sys.stderr)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(report["results"], baseline["results"], args.threshold, args.min_ms)
+        environment_info = baseline.get("environment", {})
+        print(f"基准: {args.baseline}（{environment_info.get('created')}，提交 {environment_info.get('commit')}）")
+        print_report(rows)
+        regressions = [row for row in rows if row[5] == "回归"]
+        if regressions:
+            print(f"发现 {len(regressions)} 项性能回归")
+    else:
+        print_report(compare(report["results"], {}, args.threshold, args.min_ms))
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"已保存为基准: {args.baseline}", file=sys.stderr)
+
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+﻿# backup.py
+import datetime
+import hashlib
+import json
+import os
+import threading
+import zlib
+from model import Task
+
+# 平均每块的任务数：id 的哈希值能被它整除的任务是一块的最后一个任务
+CHUNK_DIVISOR = 64
+
+# 定时备份的默认间隔和最小间隔（秒）；配置为 0 或负数时不能让工作线程空转
+DEFAULT_INTERVAL = 1800
+MIN_INTERVAL = 60
+
+class BackupRepository:
+    """
+    增量去重备份
+
+    每次备份把任务按顺序切成若干块，每块的 JSON 行压缩后以内容的 SHA-256 命名，
+    保存在 backup_dir/chunks 中；备份本身只是一个清单（manifest），记录各块的哈希。
+    分块边界只取决于任务 id，修改少量任务只会产生少量新块，
+    其余的块与之前的备份共享，不重复写入。
+
+    恢复任意一次备份只需按清单读取并解压各块。
+    超过 keep 个的旧备份在创建新备份时删除，不再被任何清单引用的块随之删除。
+    旧版本的完整 JSON 备份（tasks_backup_*.json）仍可列出和恢复。
+    """
+
+    def __init__(self, backup_dir="backups", keep=5):
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.chunk_dir = os.path.join(backup_dir, "chunks")
+        self.manifest_dir = os.path.join(backup_dir, "manifests")
+
+    @staticmethod
+    def split(tasks):
+        """把任务切分为块，返回每块的 JSON 行文本（UTF-8 编码）"""
+        chunks = []
+        lines = []
+        for task in tasks:
+            lines.append(json.dumps(task.to_dict(), ensure_ascii=False))
+            if zlib.crc32(str(task.id).encode()) % CHUNK_DIVISOR == 0:
+                chunks.append("\n".join(lines).encode("utf-8"))
+                lines = []
+        if lines:
+            chunks.append("\n".join(lines).encode("utf-8"))
+        return chunks
+
+    @staticmethod
+    def data_hash(chunk_hashes):
+        """由各块的哈希计算整份数据的哈希"""
+        return hashlib.sha256("\n".join(chunk_hashes).encode()).hexdigest()
+
+    def _chunk_path(self, chunk_hash):
+        return os.path.join(self.chunk_dir, chunk_hash + ".z")
+
+    def _manifest_path(self, name):
+        return os.path.join(self.manifest_dir, name + ".json")
+
+    def create(self, tasks):
+        """备份任务，返回备份名称；与最新的备份内容相同时不创建，返回 None"""
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        os.makedirs(self.manifest_dir, exist_ok=True)
+
+        tasks = list(tasks)
+        chunk_hashes = []
+        for chunk in self.split(tasks):
+            chunk_hash = hashlib.sha256(chunk).hexdigest()
+            chunk_hashes.append(chunk_hash)
+            path = self._chunk_path(chunk_hash)
+            if not os.path.exists(path):
+                temp_file = path + ".tmp"
+                with open(temp_file, "wb") as f:
+                    f.write(zlib.compress(chunk))
+                os.replace(temp_file, path)
+
+        data_hash = self.data_hash(chunk_hashes)
+        latest = self.latest()
+        if latest is not None and self.read_manifest(latest).get("hash") == data_hash:
+            return None
+
+        # 清单最后写入，中途出错只会留下未被引用的块
+        name = "tasks_backup_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        manifest = {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "count": len(tasks),
+            "hash": data_hash,
+            "chunks": chunk_hashes,
+        }
+        temp_file = self._manifest_path(name) + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(temp_file, self._manifest_path(name))
+
+        self.prune()
+        return name
+
+    def names(self):
+        """返回全部备份的名称，按时间从旧到新排列"""
+        names = []
+        if os.path.isdir(self.manifest_dir):
+            names += [f[:-5] for f in os.listdir(self.manifest_dir)
+                      if f.startswith("tasks_backup_") and f.endswith(".json")]
+        if os.path.isdir(self.backup_dir):
+            names += [f for f in os.listdir(self.backup_dir)
+                      if f.startswith("tasks_backup_") and f.endswith(".json")]
+        return sorted(names)
+
+    def latest(self):
+        """最新一次备份的名称，没有备份时返回 None"""
+        names = self.names()
+        return names[-1] if names else None
+
+    def read_manifest(self, name):
+        """读取备份清单；旧版本的完整 JSON 备份没有清单，返回空字典"""
+        if name.endswith(".json"):
+            return {}
+        with open(self._manifest_path(name), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def restore(self, name):
+        """读取一次备份，返回 Task 列表"""
+        if name.endswith(".json"):
+            with open(os.path.join(self.backup_dir, name), "r", encoding="utf-8") as f:
+                return [Task.from_dict(task) for task in json.load(f)]
+
+        tasks = []
+        for chunk_hash in self.read_manifest(name)["chunks"]:
+            with open(self._chunk_path(chunk_hash), "rb") as f:
+                chunk = zlib.decompress(f.read()).decode("utf-8")
+            tasks.extend(Task.from_dict(json.loads(line)) for line in chunk.split("\n"))
+        return tasks
+
+    def prune(self):
+        """只保留最新的 keep 个备份，并删除不再被引用的块"""
+        names = self.names()
+        for name in names[:-self.keep] if self.keep > 0 else []:
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.backup_dir, name))
+            else:
+                os.remove(self._manifest_path(name))
+
+        if not os.path.isdir(self.chunk_dir):
+            return
+        referenced = set()
+        for name in self.names():
+            referenced.update(self.read_manifest(name).get("chunks", ()))
+        for f in os.listdir(self.chunk_dir):
+            if f.endswith(".z") and f[:-2] not in referenced:
+                os.remove(os.path.join(self.chunk_dir, f))
+
+class BackupScheduler:
+    """
+    后台定时备份
+
+    工作线程每隔 interval 秒检查一次，启用（enabled）且任务自上次备份后有修改时
+    在工作线程中创建一次备份，不占用 Tk 主循环。数据没有变化时跳过；
+    内容与最新备份相同（哈希一致）时 BackupRepository 也不会创建新备份。
+
+    stop(final_backup=True) 在主线程中复制一份任务后立即返回，
+    最后一次备份在单独的线程中写完，不延迟窗口关闭。
+    """
+
+    def __init__(self, store, backup_dir="backups", keep=5, interval=DEFAULT_INTERVAL, enabled=False):
+        self.store = store
+        self.repository = BackupRepository(backup_dir, keep)
+        self.interval = interval
+        self.enabled = enabled
+
+        self._lock = threading.Lock()  # 同一时间只做一次备份
+        self._backed_up_version = store.version
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="BackupScheduler", daemon=True)
+        self._thread.start()
+
+    @property
+    def interval(self):
+        """检查间隔（秒），不小于 MIN_INTERVAL；设置为无效的值时使用 DEFAULT_INTERVAL"""
+        return self._interval
+
+    @interval.setter
+    def interval(self, value):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = DEFAULT_INTERVAL
+        if value != value:  # NaN
+            value = DEFAULT_INTERVAL
+        self._interval = max(MIN_INTERVAL, value)
+
+    def changed(self):
+        """任务自上次备份后是否有修改（仍在加载时视为没有，避免备份不完整的数据）"""
+        return self.store.version != self._backed_up_version and not self.store.loading
+
+    def run_once(self, force=False):
+        """
+        立即备份一次，返回备份名称；没有变化而跳过时返回 None，失败时抛出异常
+
+        force=True 时即使没有修改也检查一次（内容与最新备份相同时仍返回 None）。
+        任务还没有加载完时总是跳过。
+        """
+        with self._lock:
+            if self.store.loading or (not force and not self.changed()):
+                return None
+            version = self.store.version
+            name = self.repository.create(self.store.snapshot())
+            self._backed_up_version = version
+            return name
+
+    def stop(self, final_backup=False):
+        """结束定时备份；final_backup 为 True 且有修改时在后台做最后一次备份"""
+        self._stopping = True
+        self._wake.set()
+        if final_backup and self.changed():
+            tasks = self.store.snapshot()
+            # 非守护线程：进程会等它写完再退出
+            threading.Thread(target=self._final_backup, args=(tasks,), name="FinalBackup").start()
+
+    def _final_backup(self, tasks):
+        with self._lock:
+            try:
+                self.repository.create(tasks)
+            except Exception as e:
+                print(f"自动备份失败: {e}")
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            if self._stopping:
+                return
+            self._wake.clear()
+            if not self.enabled:
+                continue
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"自动备份失败: {e}")
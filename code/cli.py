@@ -0,0 +1,182 @@
+﻿# cli.py
+"""
+YatToDo 命令行
+
+在 code 目录下运行（与图形界面使用同一个工作目录中的 tasks.json / tasks.db 和 config.json）:
+
+    python -m cli add "写实验报告" -p 高 -d 2025-05-01
+    python -m cli add - < tasks.txt          # 每行一个任务
+    python -m cli complete 3 5 8
+    python -m cli query --status active --sort "priority,due" --format json
+    python -m cli export tasks.txt           # 也支持 .md、.csv、.jsonl、.json
+    python -m cli import tasks.csv           # 也支持 .txt、.jsonl、.json
+    python -m cli stats
+
+不打开图形界面，也不做定时备份，适合在脚本和定时任务中批量处理。
+"""
+import argparse
+import datetime
+import json
+import sys
+from engine import TaskEngine
+from model import PRIORITIES
+from importer import FORMATS
+import exporter
+
+def _read_lines(values):
+    """参数为 "-" 时从标准输入逐行读取，跳过空行"""
+    for value in values:
+        if value == "-":
+            for line in sys.stdin:
+                line = line.strip()
+                if line:
+                    yield line
+        else:
+            yield value
+
+def _parse_date(text):
+    try:
+        return datetime.date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"日期格式错误（应为 YYYY-MM-DD）: {text}")
+
+def _format_task(task):
+    status = "✓" if task.completed else "□"
+    return f"{task.id}\t{status}\t[{task.priority}]\t{task.text}\t{task.due_date}"
+
+def cmd_add(engine, args):
+    count = 0
+    for text in _read_lines(args.text):
+        task = engine.add_task(text, args.priority, args.due or "")
+        count += 1
+        if args.verbose:
+            print(_format_task(task))
+    print(f"已添加 {count} 个任务", file=sys.stderr)
+    return 0
+
+def cmd_complete(engine, args):
+    engine.load_all()
+    status = 0
+    count = 0
+    for value in _read_lines(args.ids):
+        try:
+            engine.set_completed(int(value), not args.undo)
+            count += 1
+        except (KeyError, ValueError):
+            print(f"任务不存在: {value}", file=sys.stderr)
+            status = 1
+    print(f"已修改 {count} 个任务", file=sys.stderr)
+    return status
+
+def cmd_query(engine, args):
+    engine.load_all()
+    completed = {"all": None, "active": False, "completed": True}[args.status]
+    date_range = (args.due_from, args.due_to) if args.due_from or args.due_to else None
+    tasks = engine.search(args.keyword, completed=completed, priority=args.priority, date_range=date_range,
+                          case_sensitive=args.case_sensitive, order=TaskEngine.parse_order(args.sort))
+    if args.limit is not None:
+        tasks = tasks[:args.limit]
+
+    if args.format == "json":
+        lines = [json.dumps(task.to_dict(), ensure_ascii=False) for task in tasks]
+    elif args.format == "ids":
+        lines = [str(task.id) for task in tasks]
+    else:
+        lines = [_format_task(task) for task in tasks]
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+    return 0
+
+def cmd_export(engine, args):
+    job = engine.export_file(args.filename, args.format)
+    if not job.succeeded:
+        return 1
+    print(f"已导出 {job.exported} 个任务到 {args.filename}", file=sys.stderr)
+    return 0
+
+def cmd_import(engine, args):
+    job = engine.import_file(args.filename, args.format)
+    if job.error is not None:
+        return 1
+    message = f"已导入 {job.imported} 个任务"
+    if job.skipped:
+        message += f"，跳过 {job.skipped} 行"
+    if job.invalid_dates:
+        message += f"，{job.invalid_dates} 个任务的截止日期无效（已忽略）"
+    print(message, file=sys.stderr)
+    return 0
+
+def cmd_stats(engine, args):
+    engine.load_all()
+    stats = engine.stats()
+    print(f"总任务数: {stats['total']}")
+    print(f"已完成: {stats['completed']} ({stats['completion_rate']:.1f}%)")
+    print(f"未完成: {stats['active']}")
+    print(f"已过期: {stats['overdue']}")
+    print(f"近期截止: {stats['upcoming']}")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="YatToDo 命令行")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="添加任务")
+    add.add_argument("text", nargs="+", help="任务内容，\"-\" 表示从标准输入读取（每行一个任务）")
+    add.add_argument("-p", "--priority", choices=PRIORITIES, default="中", help="优先级（默认 中）")
+    add.add_argument("-d", "--due", type=lambda text: _parse_date(text).isoformat(), help="截止日期 YYYY-MM-DD")
+    add.add_argument("-v", "--verbose", action="store_true", help="输出添加的任务")
+    add.set_defaults(func=cmd_add)
+
+    complete = commands.add_parser("complete", help="标记任务为已完成")
+    complete.add_argument("ids", nargs="+", help="任务 id，\"-\" 表示从标准输入读取（每行一个）")
+    complete.add_argument("--undo", action="store_true", help="改为标记为未完成")
+    complete.set_defaults(func=cmd_complete)
+
+    query = commands.add_parser("query", help="查询任务")
+    query.add_argument("-k", "--keyword", help="任务内容包含的关键词")
+    query.add_argument("--case-sensitive", action="store_true", help="关键词区分大小写")
+    query.add_argument("-s", "--status", choices=("all", "active", "completed"), default="all", help="完成状态")
+    query.add_argument("-p", "--priority", choices=PRIORITIES, help="优先级")
+    query.add_argument("--due-from", type=_parse_date, help="截止日期不早于（没有截止日期的任务不受限制）")
+    query.add_argument("--due-to", type=_parse_date, help="截止日期不晚于（没有截止日期的任务不受限制）")
+    query.add_argument("--sort", help="排序方式：priority、date（可加 :desc），或如 \"completed,due:desc\" 的多字段排序；"
+                                      "字段可以是 priority、due、completed、text、created")
+    query.add_argument("-n", "--limit", type=int, help="最多输出的任务数")
+    query.add_argument("-f", "--format", choices=("text", "json", "ids"), default="text",
+                       help="输出格式：text（制表符分隔）、json（每行一个任务）、ids")
+    query.set_defaults(func=cmd_query)
+
+    export = commands.add_parser("export", help="导出全部任务")
+    export.add_argument("filename", help="导出的文件")
+    export.add_argument("-f", "--format", choices=exporter.FORMATS, help="导出格式（默认按扩展名判断，不认识的按 text）")
+    export.set_defaults(func=cmd_export)
+
+    import_ = commands.add_parser("import", help="从文件导入任务")
+    import_.add_argument("filename", help="导入的文件")
+    import_.add_argument("-f", "--format", choices=FORMATS, help="文件格式（默认按扩展名判断，不认识的按 text）")
+    import_.set_defaults(func=cmd_import)
+
+    stats = commands.add_parser("stats", help="显示任务统计")
+    stats.set_defaults(func=cmd_stats)
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        TaskEngine.parse_order(getattr(args, "sort", None))  # 打开存储之前先检查排序方式
+    except ValueError as e:
+        parser.error(str(e))
+
+    engine = TaskEngine(auto_backup=False)
+    try:
+        return args.func(engine, args)
+    except ValueError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 1
+    finally:
+        engine.close(final_backup=False)
+        engine.settings.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
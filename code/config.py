@@ -1,14 +1,21 @@
-﻿import json
+﻿import atexit
+import json
 import os
+import threading
 
 # 默认配置
 DEFAULT_CONFIG = {
     "theme": "light",
     "auto_backup": False,
     "backup_count": 5,
+    "backup_interval_minutes": 30,
     "window_size": "600x500",
     "font_size": 10,
     "date_format": "%Y-%m-%d",
+    "search_debounce_ms": 250,
+    "storage": "json",
+    "snapshot_format": "json",
+    "perf_enabled": False,
 }
 
 def load_config(config_file="config.json"):
@@ -41,7 +48,85 @@ def save_config(config, config_file="config.json"):
         return False
 
 def update_config(key, value, config_file="config.json"):
-    """更新单个配置项并保存"""
-    config = load_config(config_file)
-    config[key] = value
-    return save_config(config, config_file)
+    """更新单个配置项（通过共享的 ConfigService）并立即写回文件，返回是否保存成功"""
+    service = get_config(config_file)
+    service.set(key, value)
+    return service.save()
+
+class ConfigService:
+    """
+    内存中的配置
+
+    创建时读取一次配置文件，之后 get/set 只访问内存。set 修改配置后通知订阅了该配置项的
+    回调函数，并在 save_delay 秒后由后台定时器把所有修改一次写回文件；
+    这段时间内的多次修改只写一次。退出前调用 close() 立即写回尚未保存的修改。
+    """
+
+    def __init__(self, config_file="config.json", save_delay=1.0):
+        self.config_file = config_file
+        self.save_delay = save_delay
+        self._config = load_config(config_file)
+        self._subscribers = {}  # 配置项 → 回调函数列表
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._timer = None
+
+    def __getitem__(self, key):
+        return self._config[key]
+
+    def get(self, key, default=None):
+        return self._config.get(key, default)
+
+    def set(self, key, value):
+        """修改配置项，值有变化时通知订阅者并安排写回"""
+        if self._config.get(key) == value:
+            return
+        with self._lock:
+            self._config[key] = value
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.save_delay, self.save)
+                self._timer.daemon = True
+                self._timer.start()
+        for callback in list(self._subscribers.get(key, ())):
+            callback(value)
+
+    def subscribe(self, key, callback):
+        """配置项 key 变化时调用 callback(新值)"""
+        self._subscribers.setdefault(key, []).append(callback)
+
+    def unsubscribe(self, key, callback):
+        callbacks = self._subscribers.get(key)
+        if callbacks and callback in callbacks:
+            callbacks.remove(callback)
+
+    def save(self):
+        """把尚未保存的修改写回文件"""
+        with self._lock:
+            self._timer = None
+            if not self._dirty:
+                return True
+            config = dict(self._config)
+            self._dirty = False
+        return save_config(config, self.config_file)
+
+    def close(self):
+        """取消定时写回，立即保存"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        return self.save()
+
+_services = {}
+
+def get_config(config_file="config.json"):
+    """
+    返回该配置文件共享的 ConfigService（第一次调用时读取文件）
+
+    定时写回使用守护线程，解释器退出时会被直接结束，所以同时登记退出时写回尚未保存的修改。
+    """
+    service = _services.get(config_file)
+    if service is None:
+        service = _services[config_file] = ConfigService(config_file)
+        atexit.register(service.close)
+    return service
@@ -1,198 +1,609 @@
 ﻿# data.py
+import codecs
 import json
 import os
-import datetime
-import shutil
+import re
+import threading
+from model import Task, NO_DUE
+from snapshot import is_binary_snapshot, load_binary_snapshot, write_binary_snapshot
+from backup import BackupRepository
+from sorting import sort_tasks, SortSpec
+from stats import StatsAggregator
+from perf import timed
+from exporter import export_tasks
 
-def save_tasks(tasks, filename="tasks.json"):
-    """保存任务到文件"""
+@timed("storage.save_snapshot")
+def save_tasks(tasks, filename="tasks.json", snapshot_format=None):
+    """
+    保存任务到文件（先写临时文件再替换，避免写到一半时损坏原文件）
+
+    snapshot_format 为 "json" 或 "binary"（见 snapshot.py），None 表示沿用原文件的格式
+    """
     try:
-        # 确保目录存在
-        directory = os.path.dirname(filename)
-        if (directory and not os.path.exists(directory)):
-            os.makedirs(directory)
-            
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(tasks, f, ensure_ascii=False, indent=2)
+        os.replace(write_snapshot_temp(tasks, filename, snapshot_format), filename)
         return True
     except Exception as e:
         print(f"保存任务失败: {e}")
         return False
 
+def write_snapshot_temp(tasks, filename, snapshot_format=None):
+    """把快照写到临时文件 filename + ".tmp" 并返回其路径，由调用者替换原文件；出错时抛出异常"""
+    # 确保目录存在
+    directory = os.path.dirname(filename)
+    if (directory and not os.path.exists(directory)):
+        os.makedirs(directory)
+
+    if snapshot_format is None:
+        snapshot_format = "binary" if is_binary_snapshot(filename) else "json"
+
+    temp_file = filename + ".tmp"
+    if snapshot_format == "binary":
+        with open(temp_file, "wb") as f:
+            write_binary_snapshot(tasks, f)
+    else:
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump([task.to_dict() for task in tasks], f, ensure_ascii=False, indent=2)
+    return temp_file
+
 def load_tasks(filename="tasks.json"):
-    """从文件加载任务"""
+    """从文件加载任务（快照 + 追加日志）"""
     try:
-        if os.path.exists(filename):
-            with open(filename, "r", encoding="utf-8") as f:
-                return json.load(f)
-        else:
-            return []
+        index = load_task_index(filename, TaskJournal.pending_logs(filename))
+        return list(index.values())
     except Exception as e:
         print(f"加载任务失败: {e}")
         return []
 
-def export_tasks_as_text(tasks, filename="tasks.txt"):
-    """导出任务为文本文件"""
+@timed("storage.load_snapshot")
+def load_task_index(filename, log_files=()):
+    """读取快照并依次重放日志文件，返回按添加顺序排列的 {id: 任务} 字典"""
+    if is_binary_snapshot(filename):
+        tasks = load_binary_snapshot(filename).to_tasks()
+    elif os.path.exists(filename):
+        with open(filename, "r", encoding="utf-8") as f:
+            tasks = [Task.from_dict(task) for task in json.load(f)]
+    else:
+        tasks = []
+
+    # 旧版本保存的任务没有 id，按顺序补上（同一快照每次分配的结果相同）
+    assign_task_ids(tasks)
+    index = {task.id: task for task in tasks}
+
+    # 重放快照之后追加的修改记录
+    for log_file in log_files:
+        replay_journal(index, log_file)
+    return index
+
+# JSON 数组元素之间的空白和逗号
+_SEPARATORS = re.compile(r"[\s,]*")
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """
+    从以二进制方式打开的文件中逐个解析 JSON 数组的元素
+
+    每次只读取 chunk_size 字节，用 JSONDecoder.raw_decode 解析缓冲区中完整的元素，
+    不必把整个文件读入内存后再解析。
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    pos = 0
+    started = False
+    while True:
+        chunk = f.read(chunk_size)
+        buffer = buffer[pos:] + text_decoder.decode(chunk, final=not chunk)
+        pos = 0
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("任务文件不是 JSON 数组")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break  # 元素不完整，继续读取
+            if end == len(buffer) and chunk:
+                break  # 数字等元素可能还没读完
+            yield item
+            pos = end
+
+        if not chunk:
+            if started:
+                raise ValueError("任务文件不完整")
+            return
+
+def iter_tasks(filename, log_files=(), progress=None):
+    """
+    逐个读取快照中的任务，结果与 load_task_index 相同
+
+    先读取（较小的）日志文件并按 id 合并修改，解析快照时把修改直接应用到对应任务上，
+    已删除的任务不交出；快照之后新增的任务最后按添加顺序交出。
+    缺少 id 的旧版本任务要等读完快照才能分配 id，因此放到最后交出。
+    progress(已读取的比例) 在每读取一个任务后调用。
+    """
+    records = []
+    for log_file in log_files:
+        with open(log_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    patches = {}
+    for record in coalesce_records(records):
+        patches[record["task"]["id"] if record["op"] == "add" else record["id"]] = record
+
+    def patched(task):
+        record = patches.pop(task.id, None)
+        if record is None:
+            return task
+        if record["op"] == "update":
+            task.update(**record["fields"])
+            return task
+        if record["op"] == "add":
+            return Task.from_dict(record["task"])
+        return None  # 已删除
+
+    legacy = []
+    max_id = 0
+    if is_binary_snapshot(filename):
+        # 二进制快照映射到内存，每次取出一段
+        table = load_binary_snapshot(filename)
+        total = len(table)
+        for start in range(0, total, 1000):
+            for task in table.to_tasks(start, min(start + 1000, total)):
+                if task.id is None:
+                    legacy.append(task)
+                    continue
+                max_id = max(max_id, task.id)
+                task = patched(task)
+                if task is not None:
+                    yield task
+            if progress:
+                progress(min(start + 1000, total) / total)
+        del table
+    elif os.path.exists(filename):
+        size = os.path.getsize(filename) or 1
+        with open(filename, "rb") as f:
+            for item in iter_json_array(f):
+                task = Task.from_dict(item)
+                if task.id is None:
+                    legacy.append(task)
+                    continue
+                max_id = max(max_id, task.id)
+                task = patched(task)
+                if task is not None:
+                    yield task
+                if progress:
+                    progress(f.tell() / size)
+
+    next_id = max_id + 1
+    for task in legacy:
+        task.id = next_id
+        next_id += 1
+        task = patched(task)
+        if task is not None:
+            yield task
+
+    for record in patches.values():
+        if record["op"] == "add":
+            yield Task.from_dict(record["task"])
+
+def assign_task_ids(tasks, next_id=1):
+    """为缺少 id 的任务分配唯一的整数 id（不小于 next_id），返回下一个可用的 id"""
+    next_id = max(next_id, max((task.id for task in tasks if task.id is not None), default=0) + 1)
+    for task in tasks:
+        if task.id is None:
+            task.id = next_id
+            next_id += 1
+    return next_id
+
+def read_next_id(filename):
+    """
+    读取快照的元数据文件（<快照>.meta）中记录的下一个 id，没有时返回 1
+
+    任务删除后它的 id 也不再分配给新任务：日志合并进快照时把已经用过的最大 id 记录在这里，
+    否则删除 id 最大的任务后，重启时会把它的 id 分给下一个新任务。
+    """
     try:
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write("========== ToDo任务列表 ==========\n")
-            f.write(f"导出时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"总任务数: {len(tasks)}\n")
-            f.write("================================\n\n")
-            
-            # 按优先级分组
-            for priority in ["高", "中", "低"]:
-                priority_tasks = [t for t in tasks if t.get("priority") == priority]
-                if priority_tasks:
-                    f.write(f"[{priority}优先级] ({len(priority_tasks)}项)\n")
-                    f.write("--------------------------\n")
-                    for i, task in enumerate(priority_tasks, 1):
-                        status = "✓" if task.get("completed", False) else "□"
-                        text = task.get("text", "")
-                        due_date = f" (截止: {task['due_date']})" if task.get("due_date") else ""
-                        f.write(f"{i}. {status} {text}{due_date}\n")
-                    f.write("\n")
-            
-            # 统计信息
-            completed = sum(1 for t in tasks if t.get("completed", False))
-            f.write("========== 统计信息 ==========\n")
-            f.write(f"已完成任务: {completed} ({(completed/len(tasks)*100) if tasks else 0:.1f}%)\n")
-            f.write(f"未完成任务: {len(tasks) - completed}\n")
-            
-            # 检查过期任务
-            today = datetime.date.today()
-            overdue = 0
-            for task in tasks:
-                if not task.get("completed") and task.get("due_date"):
-                    try:
-                        due = datetime.datetime.strptime(task["due_date"], "%Y-%m-%d").date()
-                        if due < today:
-                            overdue += 1
-                    except:
-                        pass
-            if overdue:
-                f.write(f"已过期任务: {overdue}\n")
+        with open(filename + ".meta", "r", encoding="utf-8") as f:
+            return int(json.load(f).get("next_id", 1))
+    except (OSError, ValueError, TypeError, AttributeError):
+        return 1
+
+def write_next_id(filename, next_id):
+    """把下一个 id 写入快照的元数据文件（先写临时文件再替换）"""
+    meta_file = filename + ".meta"
+    with open(meta_file + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"next_id": next_id}, f)
+    os.replace(meta_file + ".tmp", meta_file)
+
+def logged_next_id(log_files):
+    """日志记录中出现过的最大 id 加一（包括已删除的任务），没有记录时返回 1"""
+    max_id = 0
+    for log_file in log_files:
+        with open(log_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    task_id = record["task"]["id"] if record["op"] == "add" else record["id"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if isinstance(task_id, int) and task_id > max_id:
+                    max_id = task_id
+    return max_id + 1
+
+def stored_next_id(filename, log_files=()):
+    """快照（元数据文件）和日志中记录的下一个 id，不小于任何用过的 id 加一"""
+    return max(read_next_id(filename), logged_next_id(log_files))
+
+def add_record(task):
+    """新增任务的日志记录"""
+    return {"op": "add", "task": task.to_dict()}
+
+def update_record(task_id, fields):
+    """修改任务部分字段的日志记录"""
+    return {"op": "update", "id": task_id, "fields": dict(fields)}
+
+def delete_record(task_id):
+    """删除任务的日志记录"""
+    return {"op": "delete", "id": task_id}
+
+def coalesce_records(records):
+    """
+    合并同一任务的多条日志记录，结果与依次应用原记录等价
+
+    新增后再修改合并为一条新增，多次修改合并为一条修改，修改后删除只保留删除。
+    新增后又删除的任务只保留删除记录（应用时不做任何事），存储由此知道这个 id 已经用过。
+    """
+    merged = {}
+    for record in records:
+        op = record["op"]
+        task_id = record["task"]["id"] if op == "add" else record["id"]
+        previous = merged.get(task_id)
+
+        if op == "update" and previous is not None:
+            if previous["op"] == "add":
+                previous["task"] = dict(previous["task"], **record["fields"])
+            else:
+                previous["fields"] = dict(previous["fields"], **record["fields"])
+        elif op == "delete" and previous is not None and previous["op"] == "add":
+            merged[task_id] = {"op": "delete", "id": task_id}
+        else:
+            merged[task_id] = dict(record)
+    return list(merged.values())
+
+def replay_journal(index, log_file):
+    """将日志文件中的修改记录依次应用到 {id: 任务} 字典上"""
+    with open(log_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 最后一行可能在写入时被中断，忽略不完整的记录
+                continue
+
+            op = record.get("op")
+            if op == "add":
+                task = Task.from_dict(record["task"])
+                index[task.id] = task
+            elif op == "update":
+                task = index.get(record["id"])
+                if task is not None:
+                    task.update(**record["fields"])
+            elif op == "delete":
+                index.pop(record["id"], None)
+    return index
+
+class TaskJournal:
+    """
+    追加式任务日志
+
+    每次增删改只在 tasks.json.log 末尾追加一行记录，写入代价与任务总数无关。
+    日志记录数超过阈值时，在后台线程中把日志合并进快照文件 tasks.json。
+
+    合并过程：先把当前日志改名为 tasks.json.log.compacting（新的修改继续写入新日志），
+    后台线程读取快照、重放该文件、原子地写回快照，最后删除该文件。
+
+    rewrite() 用新的任务列表替换快照：先写好临时快照，再把旧日志改名为 *.stale，
+    然后替换快照、删除 *.stale。替换快照是唯一的提交点，中途中断时由 recover_rewrite() 收尾。
+    """
+
+    def __init__(self, filename="tasks.json", compact_threshold=1000, snapshot_format=None):
+        self.filename = filename
+        self.log_file = filename + ".log"
+        self.compacting_file = filename + ".log.compacting"
+        self.compact_threshold = compact_threshold
+        self.snapshot_format = snapshot_format  # 合并时写出的快照格式，None 表示沿用原格式
+
+        self._lock = threading.Lock()
+        self._handle = None
+        self._compact_thread = None
+        self.recover_rewrite(filename)
+        self._records = self._count_records(self.log_file)
+
+        # 上次合并被中断时留下的文件，启动时继续完成合并
+        if os.path.exists(self.compacting_file) or self._records >= compact_threshold:
+            self.compact()
+
+    @staticmethod
+    def recover_rewrite(filename):
+        """
+        完成上次被中断的 rewrite()
+
+        留下了 *.stale 日志时：临时快照还在说明新快照没有装上，把日志改回原名；
+        否则新快照已经替换了旧快照，这些日志已经过时，直接删除（不能在新快照上重放）。
+        """
+        installed = not os.path.exists(filename + ".tmp")
+        for log_file in (filename + ".log.compacting", filename + ".log"):
+            stale_file = log_file + ".stale"
+            if os.path.exists(stale_file):
+                if installed:
+                    os.remove(stale_file)
+                else:
+                    os.replace(stale_file, log_file)
+
+    @staticmethod
+    def pending_logs(filename):
+        """返回尚未合并进快照的日志文件（按应用顺序）"""
+        TaskJournal.recover_rewrite(filename)
+        logs = []
+
+        # 合并被中断时留下的文件总是重放：无法可靠地判断快照是否已经包含它
+        # （FAT、SMB 等文件系统的修改时间精度只有 1~2 秒），而重放新增、修改、删除记录是幂等的，
+        # 快照已经包含这些修改时再应用一次结果不变
+        compacting_file = filename + ".log.compacting"
+        if os.path.exists(compacting_file):
+            logs.append(compacting_file)
+
+        log_file = filename + ".log"
+        if os.path.exists(log_file):
+            logs.append(log_file)
+        return logs
+
+    @staticmethod
+    def _count_records(log_file):
+        if not os.path.exists(log_file):
+            return 0
+        with open(log_file, "rb") as f:
+            return sum(1 for _ in f)
+
+    def add(self, task):
+        """记录新增任务"""
+        self.write_records([add_record(task)])
+
+    def update(self, task_id, fields):
+        """记录任务的部分字段被修改"""
+        self.write_records([update_record(task_id, fields)])
+
+    def delete(self, task_id):
+        """记录删除任务"""
+        self.write_records([delete_record(task_id)])
+
+    def write_records(self, records):
+        """把一批记录一次性追加到日志末尾"""
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with self._lock:
+            if self._handle is None:
+                directory = os.path.dirname(self.log_file)
+                if directory and not os.path.exists(directory):
+                    os.makedirs(directory)
+                self._handle = open(self.log_file, "a", encoding="utf-8")
+            self._handle.write(data)
+            self._handle.flush()
+            self._records += len(records)
+            need_compact = self._records >= self.compact_threshold
+
+        if need_compact:
+            self.compact()
+
+    def compact(self):
+        """在后台线程中把日志合并进快照，已有合并在进行时直接返回"""
+        if self._compact_thread is not None and self._compact_thread.is_alive():
+            return
+
+        with self._lock:
+            if not os.path.exists(self.compacting_file):
+                if self._records == 0:
+                    return
+                if self._handle is not None:
+                    self._handle.close()
+                    self._handle = None
+                os.replace(self.log_file, self.compacting_file)
+                self._records = 0
+
+        self._compact_thread = threading.Thread(target=self._run_compaction, name="TaskJournalCompaction")
+        self._compact_thread.start()
+
+    def _run_compaction(self):
+        try:
+            if os.path.exists(self.compacting_file):
+                index = load_task_index(self.filename, [self.compacting_file])
+                # 先记下用过的最大 id，日志删除后也不会把已删除任务的 id 分给新任务
+                next_id = max(stored_next_id(self.filename, [self.compacting_file]), max(index, default=0) + 1)
+                write_next_id(self.filename, next_id)
+                if not save_tasks(list(index.values()), self.filename, self.snapshot_format):
+                    return
+            os.remove(self.compacting_file)
+        except Exception as e:
+            print(f"合并任务日志失败: {e}")
+
+    def rewrite(self, tasks):
+        """把完整任务列表写成新快照并清空日志"""
+        self.wait()
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            logs = [log_file for log_file in (self.compacting_file, self.log_file) if os.path.exists(log_file)]
+            next_id = max(stored_next_id(self.filename, logs),
+                          max((task.id for task in tasks if task.id is not None), default=0) + 1)
+            write_next_id(self.filename, next_id)
+            try:
+                temp_file = write_snapshot_temp(tasks, self.filename, self.snapshot_format)
+            except Exception as e:
+                print(f"保存任务失败: {e}")
+                return False
+
+            # 先移走旧日志再替换快照：无论在哪一步中断，旧日志都不会在新快照上重放
+            # （那样会找回恢复、导入、替换时删掉的任务）
+            stale_logs = []
+            try:
+                for log_file in (self.compacting_file, self.log_file):
+                    if os.path.exists(log_file):
+                        os.replace(log_file, log_file + ".stale")
+                        stale_logs.append(log_file)
+                os.replace(temp_file, self.filename)
+            except Exception as e:
+                print(f"保存任务失败: {e}")
+                # 新快照没有装上，旧日志改回原名
+                for log_file in stale_logs:
+                    os.replace(log_file + ".stale", log_file)
+                return False
+            for log_file in stale_logs:
+                os.remove(log_file + ".stale")
+            self._records = 0
         return True
-    except Exception as e:
-        print(f"导出任务失败: {e}")
-        return False
 
-def backup_tasks(tasks, backup_dir="backups"):
-    """备份任务数据"""
+    def wait(self):
+        """等待正在进行的后台合并完成"""
+        if self._compact_thread is not None:
+            self._compact_thread.join()
+
+    def close(self):
+        """关闭日志文件并等待后台合并完成"""
+        self.wait()
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+class JsonStorage:
+    """
+    文件任务存储：tasks.json 快照 + 追加日志
+
+    快照可以是 JSON 或二进制格式（snapshot_format），读取时自动识别；
+    切换格式后在下一次合并日志时以新格式写出快照。
+
+    存储接口（SqliteStorage 与之相同）:
+    - load(): 读取全部任务，返回按添加顺序排列的 Task 列表
+    - iter_load(): 按添加顺序逐个读取任务，load_progress 记录已读取的比例
+    - write_records(records): 应用一批日志记录（add_record 等生成的字典）
+    - save(tasks): 用完整的任务列表替换已保存的数据
+    - close(): 写完数据并释放文件
+    - next_id: 读取之后可用，下一个从未使用过的 id（已删除任务的 id 不会再分配）
+    """
+
+    def __init__(self, filename="tasks.json", snapshot_format=None):
+        self.filename = filename
+        self.snapshot_format = snapshot_format
+        self.journal = None
+        self.load_progress = 0.0
+        self.next_id = 1
+
+    def _open_journal(self):
+        # 读取之后再打开日志，启动时的后台合并不会与读取同时进行
+        if self.journal is None:
+            self.journal = TaskJournal(self.filename, snapshot_format=self.snapshot_format)
+        return self.journal
+
+    def load(self):
+        self.next_id = stored_next_id(self.filename, TaskJournal.pending_logs(self.filename))
+        tasks = load_tasks(self.filename)
+        self._open_journal()
+        self.load_progress = 1.0
+        return tasks
+
+    def iter_load(self):
+        def progress(fraction):
+            self.load_progress = fraction
+
+        log_files = TaskJournal.pending_logs(self.filename)
+        self.next_id = stored_next_id(self.filename, log_files)
+        yield from iter_tasks(self.filename, log_files, progress)
+        self._open_journal()
+        self.load_progress = 1.0
+
+    def write_records(self, records):
+        self._open_journal().write_records(records)
+
+    def save(self, tasks):
+        return self._open_journal().rewrite(tasks)
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+
+def open_storage(backend="json", snapshot_format=None):
+    """
+    按配置项 storage 打开任务存储
+
+    - "json": tasks.json，snapshot_format 为快照格式（配置项 snapshot_format）
+    - "sqlite": tasks.db，第一次打开时从 tasks.json 或最新的备份迁移任务
+    """
+    if backend == "sqlite":
+        from sqlite_storage import SqliteStorage, migrate_from_json
+        storage = SqliteStorage("tasks.db")
+        migrate_from_json(storage)
+        return storage
+    return JsonStorage("tasks.json", snapshot_format)
+
+def export_tasks_as_text(tasks, filename="tasks.txt"):
+    """导出任务为文本文件（按优先级分组，附统计信息；只遍历一次任务，见 exporter.py）"""
+    return export_tasks(tasks, filename, "text")
+
+def backup_tasks(tasks, backup_dir="backups", keep=5):
+    """增量备份任务数据（见 backup.BackupRepository），只保留最新的 keep 个备份"""
     try:
-        # 确保备份目录存在
-        if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir)
-        
-        # 使用时间戳创建备份文件名
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = os.path.join(backup_dir, f"tasks_backup_{timestamp}.json")
-        
-        # 创建备份
-        with open(backup_file, "w", encoding="utf-8") as f:
-            json.dump(tasks, f, ensure_ascii=False, indent=2)
-        
-        # 清理过旧的备份（保留最新的5个）
-        backup_files = sorted([os.path.join(backup_dir, f) for f in os.listdir(backup_dir)
-                             if f.startswith("tasks_backup_") and f.endswith(".json")])
-        
-        if len(backup_files) > 5:
-            for old_file in backup_files[:-5]:
-                os.remove(old_file)
-                
+        BackupRepository(backup_dir, keep).create(tasks)
         return True
     except Exception as e:
         print(f"备份任务失败: {e}")
         return False
 
 def get_task_stats(tasks):
-    """获取任务统计信息"""
-    if not tasks:
-        return {
-            "total": 0,
-            "completed": 0,
-            "active": 0,
-            "overdue": 0,
-            "upcoming": 0,
-            "completion_rate": 0
-        }
-    
-    total = len(tasks)
-    completed = sum(1 for t in tasks if t.get("completed", False))
-    active = total - completed
-    
-    today = datetime.date.today()
-    overdue = 0
-    upcoming = 0
-    
-    for task in tasks:
-        if not task.get("completed") and task.get("due_date"):
-            try:
-                due = datetime.datetime.strptime(task["due_date"], "%Y-%m-%d").date()
-                if due < today:
-                    overdue += 1
-                elif (due - today).days <= 3:
-                    upcoming += 1
-            except:
-                pass
-    
-    return {
-        "total": total,
-        "completed": completed,
-        "active": active,
-        "overdue": overdue,
-        "upcoming": upcoming,
-        "completion_rate": (completed / total * 100) if total > 0 else 0
-    }
-
-def import_from_text(filename):
-    """从文本文件导入任务（简单格式）"""
+    """
+    获取任务统计信息
+
+    tasks 为 TaskStore 时直接读取它维护的计数器，否则遍历一次任务列表统计。
+    """
+    stats = getattr(tasks, "stats", None)
+    if stats is not None:
+        return stats()
+    aggregator = StatsAggregator()
+    aggregator.build(tasks)
+    return aggregator.stats()
+
+def import_from_text(filename, file_format=None):
+    """
+    从文件导入任务，返回任务列表（没有 id）
+
+    格式见 importer.py（默认按扩展名判断，.txt 为 "[优先级] 任务内容 (截止日期)" 的简单格式）。
+    大文件应使用 importer.ImportJob 逐批加入 TaskStore，不必把全部任务放进一个列表。
+    """
+    from importer import iter_import
     try:
-        tasks = []
-        with open(filename, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith("#"):
-                    # 解析格式: [优先级] 任务内容 (截止日期)
-                    priority = "中"
-                    if line.startswith("[高]"):
-                        priority = "高"
-                        line = line[3:].strip()
-                    elif line.startswith("[中]"):
-                        line = line[3:].strip()
-                    elif line.startswith("[低]"):
-                        priority = "低"
-                        line = line[3:].strip()
-                    
-                    # 检查是否有截止日期
-                    due_date = ""
-                    if "(" in line and line.endswith(")"):
-                        text, date_part = line.rsplit("(", 1)
-                        text = text.strip()
-                        date_part = date_part.rstrip(")")
-                        if date_part:
-                            due_date = date_part
-                    else:
-                        text = line
-                    
-                    task = {
-                        "text": text,
-                        "priority": priority,
-                        "completed": False,
-                        "due_date": due_date
-                    }
-                    tasks.append(task)
-        return tasks
+        return list(iter_import(filename, file_format))
     except Exception as e:
         print(f"导入任务失败: {e}")
         return None
 
+@timed("search.search_tasks")
 def search_tasks(tasks, keyword, case_sensitive=False, completed_filter=None, priority_filter=None, date_range=None):
     """
     搜索符合条件的任务
     
     参数:
-    - tasks: 任务列表
+    - tasks: 任务列表或 TaskStore（使用其二级索引和倒排索引查询）
     - keyword: 搜索关键词
     - case_sensitive: 是否区分大小写
     - completed_filter: None=全部, True=已完成, False=未完成
@@ -202,32 +613,39 @@ def search_tasks(tasks, keyword, case_sensitive=False, completed_filter=None, pr
     返回:
     - 匹配的任务列表
     """
+    # 传入 TaskStore 时直接使用其索引查询
+    if hasattr(tasks, "query"):
+        return tasks.query(completed_filter, priority_filter, date_range, keyword, case_sensitive)
+    
     results = []
     
+    # 日期范围先转换为日期序号，与任务缓存的截止日期直接比较
+    if date_range:
+        start_date, end_date = date_range
+        start = start_date.toordinal() if start_date else None
+        end = end_date.toordinal() if end_date else None
+    
     for task in tasks:
         # 检查完成状态过滤
-        if completed_filter is not None and task.get("completed", False) != completed_filter:
+        if completed_filter is not None and task.completed != completed_filter:
             continue
             
         # 检查优先级过滤
-        if priority_filter and task.get("priority") != priority_filter:
+        if priority_filter and task.priority != priority_filter:
             continue
             
         # 检查日期范围
-        if date_range and task.get("due_date"):
-            try:
-                task_date = datetime.datetime.strptime(task.get("due_date"), "%Y-%m-%d").date()
-                start_date, end_date = date_range
-                if start_date and task_date < start_date:
+        if date_range:
+            due = task.due
+            if due != NO_DUE:
+                if start is not None and due < start:
                     continue
-                if end_date and task_date > end_date:
+                if end is not None and due > end:
                     continue
-            except:
-                pass
                 
         # 关键词搜索
         if keyword:
-            task_text = task.get("text", "")
+            task_text = task.text
             if not case_sensitive:
                 if keyword.lower() in task_text.lower():
                     results.append(task)
@@ -241,44 +659,22 @@ def search_tasks(tasks, keyword, case_sensitive=False, completed_filter=None, pr
     return results
 
 def sort_tasks_by_priority(tasks, reverse=False):
-    """按优先级排序任务"""
-    priority_map = {"高": 0, "中": 1, "低": 2}
-    
-    # 创建任务副本以避免修改原始数据
-    sorted_tasks = tasks.copy()
-    
-    # 先按完成状态分组，然后在每组内按优先级排序
-    sorted_tasks.sort(
-        key=lambda t: (
-            t.get("completed", False),  # 完成状态（False排在前面）
-            priority_map.get(t.get("priority", "中"), 1)  # 优先级
-        ),
-        reverse=reverse
-    )
-    
-    return sorted_tasks
+    """按优先级排序任务（返回新列表，排序规则见 sorting.priority_key）"""
+    return sort_tasks(tasks, "priority", reverse)
 
 def sort_tasks_by_date(tasks, reverse=False):
-    """按截止日期排序任务"""
-    today = datetime.date.today()
-    
-    # 创建任务副本以避免修改原始数据
-    sorted_tasks = tasks.copy()
-    
-    def get_date_value(task):
-        # 完成的任务放在最后
-        if task.get("completed", False):
-            return datetime.date.max
-        
-        # 没有截止日期的任务根据reverse决定位置
-        if not task.get("due_date"):
-            return datetime.date.min if reverse else datetime.date.max
-        
-        # 有截止日期的按日期排序
-        try:
-            return datetime.datetime.strptime(task.get("due_date"), "%Y-%m-%d").date()
-        except:
-            return today
-    
-    sorted_tasks.sort(key=get_date_value, reverse=reverse)
-    return sorted_tasks
\ No newline at end of file
+    """按截止日期排序任务（返回新列表，排序规则见 sorting.date_key）"""
+    return sort_tasks(tasks, "date", reverse)
+
+def sort_tasks_by_spec(tasks, spec):
+    """
+    按自定义的多个字段排序任务（返回新列表）
+
+    参数:
+    - tasks: 任务列表
+    - spec: SortSpec，或 "completed,priority,due:desc" 格式的字符串；
+      字段可以是 priority、due、completed、text、created，默认升序
+    """
+    if not isinstance(spec, SortSpec):
+        spec = SortSpec.parse(spec)
+    return spec.sort(tasks)
\ No newline at end of file
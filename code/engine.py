@@ -0,0 +1,264 @@
+﻿# engine.py
+import itertools
+import perf
+from config import get_config
+from data import open_storage, get_task_stats
+from store import TaskStore
+from model import Task
+from backup import BackupScheduler
+from sorting import SortSpec
+from importer import ImportJob
+from exporter import ExportJob
+
+# 界面上的过滤方式 → 完成状态（None 表示不限）
+FILTERS = {
+    "全部": None,
+    "未完成": False,
+    "已完成": True,
+    "优先级": None,
+}
+
+class TaskEngine:
+    """
+    任务引擎：不依赖 Tkinter 的应用核心
+
+    持有任务存储（TaskStore）、配置和定时备份，提供添加、修改、完成、删除、
+    过滤、排序、查找、统计、导入导出和备份恢复等全部操作。图形界面（ui.py）和
+    命令行（cli.py）都只调用这里的方法。
+
+    存储方式和快照格式由配置项 storage、snapshot_format 决定。lazy=True 时创建后不读取任务，
+    由调用者反复调用 load_more() 分批读取（界面启动时使用）；否则一次读完。
+    auto_backup 为 None 时按配置项决定是否定时备份，命令行传入 False 不做定时备份。
+
+    性能统计（perf.py）按环境变量 YATTODO_PERF 或配置项 perf_enabled 开启。
+    """
+
+    def __init__(self, settings=None, storage=None, lazy=False, auto_backup=None):
+        self._owns_settings = settings is None
+        self.settings = settings if settings is not None else get_config()
+        perf.configure(self.settings)
+        if storage is None:
+            storage = open_storage(self.settings["storage"], self.settings["snapshot_format"])
+        self.store = TaskStore(storage=storage, lazy=lazy)
+
+        enabled = self.settings["auto_backup"] if auto_backup is None else auto_backup
+        self.backup_scheduler = BackupScheduler(self.store, keep=self.settings["backup_count"],
+                                                interval=self._interval_seconds(self.settings["backup_interval_minutes"]),
+                                                enabled=enabled)
+        if auto_backup is None:
+            self.settings.subscribe("auto_backup", self._on_auto_backup_changed)
+        self.settings.subscribe("backup_count", self._on_backup_count_changed)
+        self.settings.subscribe("backup_interval_minutes", self._on_backup_interval_changed)
+
+    def _on_auto_backup_changed(self, value):
+        self.backup_scheduler.enabled = value
+
+    def _on_backup_count_changed(self, value):
+        self.backup_scheduler.repository.keep = value
+
+    @staticmethod
+    def _interval_seconds(minutes):
+        """配置项 backup_interval_minutes 换算为秒；无效的值交给 BackupScheduler 换成默认间隔"""
+        try:
+            return float(minutes) * 60
+        except (TypeError, ValueError):
+            return None
+
+    def _on_backup_interval_changed(self, value):
+        # 下一次等待时生效
+        self.backup_scheduler.interval = self._interval_seconds(value)
+
+    def __len__(self):
+        return len(self.store)
+
+    def __iter__(self):
+        return iter(self.store)
+
+    def get(self, task_id):
+        """按 id 获取任务，不存在时返回 None"""
+        return self.store.get(task_id)
+
+    # 加载
+
+    @property
+    def loading(self):
+        """是否还有任务没有读取"""
+        return self.store.loading
+
+    @property
+    def load_progress(self):
+        """已读取的比例（0~1）"""
+        return self.store.load_progress
+
+    def load_more(self, count=1000):
+        """继续读取最多 count 个任务，返回本次读取的任务列表"""
+        return self.store.load_more(count)
+
+    def load_all(self):
+        """读取剩余的全部任务"""
+        self.store.load_all()
+
+    # 修改
+
+    def add_task(self, text, priority="中", due_date="", completed=False):
+        """添加任务，返回新任务；文本为空时抛出 ValueError"""
+        text = text.strip()
+        if not text:
+            raise ValueError("任务不能为空")
+        return self.store.add(Task(text, priority, completed, due_date))
+
+    def add_tasks(self, tasks):
+        """批量添加任务（Task 或 JSON 格式的字典），返回添加的任务列表"""
+        return self.store.add_many(tasks)
+
+    def update_task(self, task_id, **fields):
+        """修改任务的部分字段，返回修改后的任务；任务不存在时抛出 KeyError"""
+        if "text" in fields:
+            fields["text"] = fields["text"].strip()
+            if not fields["text"]:
+                raise ValueError("任务不能为空")
+        return self.store.update(task_id, **fields)
+
+    def set_completed(self, task_id, completed=True):
+        """标记任务为已完成/未完成"""
+        return self.store.update(task_id, completed=completed)
+
+    def toggle_completed(self, task_id):
+        """切换任务的完成状态"""
+        task = self.store.get(task_id)
+        if task is None:
+            raise KeyError(task_id)
+        return self.store.update(task_id, completed=not task.completed)
+
+    def remove_task(self, task_id):
+        """删除任务，返回被删除的任务"""
+        return self.store.remove(task_id)
+
+    # 查询
+
+    @perf.timed("engine.filter")
+    def filter_tasks(self, filter_type="全部", priority=None, order=None):
+        """
+        按界面上的过滤方式返回任务列表
+
+        参数:
+        - filter_type: "全部"、"未完成"、"已完成" 或 "优先级"
+        - priority: filter_type 为 "优先级" 时要显示的优先级
+        - order: 排序方式 (sort_type, reverse) 或 SortSpec，None 表示按添加顺序
+        """
+        priority = priority if filter_type == "优先级" else None
+        return self.store.query(completed=FILTERS.get(filter_type), priority=priority, order=order)
+
+    @perf.timed("engine.search")
+    def search(self, keyword=None, completed=None, priority=None, date_range=None, case_sensitive=False,
+               order=None, cancelled=None):
+        """按关键词等条件查找任务，参数见 TaskStore.query（被 cancelled 取消时返回 None）"""
+        return self.store.query(completed=completed, priority=priority, date_range=date_range, keyword=keyword,
+                                case_sensitive=case_sensitive, order=order, cancelled=cancelled)
+
+    @staticmethod
+    def parse_order(text):
+        """
+        把排序方式的文字表示转换为 query 的 order 参数
+
+        "priority"、"date" 加可选的 ":desc" 使用原有的排序按钮规则，"none" 或空表示不排序，
+        其他按 SortSpec 解析（如 "completed,due:desc"）。
+        """
+        text = (text or "").strip()
+        if not text or text == "none":
+            return None
+        sort_type, _, direction = text.partition(":")
+        if sort_type in ("priority", "date") and "," not in text:
+            return sort_type, direction == "desc"
+        return SortSpec.parse(text)
+
+    def stats(self):
+        """任务统计（总数、已完成、未完成、已过期、近期截止、完成率）"""
+        return get_task_stats(self.store)
+
+    def writer_stats(self):
+        """后台保存线程的统计（队列长度、写入耗时等）"""
+        return self.store.writer.stats()
+
+    # 导出、备份与恢复
+
+    def export_file(self, filename, file_format=None, background=False):
+        """
+        导出全部任务（格式见 exporter.py，默认按扩展名判断），返回 ExportJob
+
+        background=True 时在后台线程中导出并立即返回，调用者读取 ExportJob 的进度或调用 cancel()；
+        否则导出完成后返回。导出的是调用时的任务列表，之后添加、删除的任务不受影响；
+        任务由导出线程逐批在锁内复制（TaskStore.iter_snapshot），不会写出修改到一半的任务。
+        """
+        self.store.load_all()
+        tasks = itertools.chain.from_iterable(self.store.iter_snapshot())
+        job = ExportJob(tasks, filename, file_format, total=len(self.store))
+        if background:
+            return job.start()
+        job.run()
+        return job
+
+    def export_text(self, filename):
+        """导出为文本文件，返回是否成功"""
+        return self.export_file(filename, "text").succeeded
+
+    def export_json(self, filename):
+        """导出为 JSON 文件（与快照格式无关），返回是否成功"""
+        return self.export_file(filename, "json").succeeded
+
+    def import_file(self, filename, file_format=None, background=False):
+        """
+        从文件导入任务（格式见 importer.py），返回 ImportJob
+
+        background=True 时在后台线程中导入并立即返回，调用者读取 ImportJob 的进度或调用 cancel()；
+        否则导入完成后返回。
+        """
+        self.store.load_all()
+        job = ImportJob(self.store, filename, file_format)
+        if background:
+            return job.start()
+        job.run()
+        return job
+
+    def backup(self, force=True):
+        """立即备份一次，返回备份名称；内容与最新的备份相同时返回 None，失败时抛出异常"""
+        self.store.load_all()
+        return self.backup_scheduler.run_once(force=force)
+
+    def list_backups(self):
+        """返回全部备份 [(名称, 任务数或 None)]，最新的在前"""
+        repository = self.backup_scheduler.repository
+        backups = []
+        for name in reversed(repository.names()):
+            try:
+                count = repository.read_manifest(name).get("count")
+            except (OSError, ValueError):
+                count = None
+            backups.append((name, count))
+        return backups
+
+    def restore_backup(self, name):
+        """用备份 name 替换全部任务，返回 (恢复的任务数, 是否保存成功)；读取备份失败时抛出异常"""
+        tasks = self.backup_scheduler.repository.restore(name)
+        return len(tasks), self.store.replace(tasks)
+
+    def flush(self):
+        """等待所有修改写入磁盘"""
+        self.store.flush()
+
+    def close(self, final_backup=None):
+        """
+        退出前调用：写完未保存的修改（包括自己读取的配置）
+
+        final_backup 为 None 时，开启了自动备份就在后台做最后一次备份。
+        """
+        if final_backup is None:
+            final_backup = self.backup_scheduler.enabled
+        self.settings.unsubscribe("auto_backup", self._on_auto_backup_changed)
+        self.settings.unsubscribe("backup_count", self._on_backup_count_changed)
+        self.settings.unsubscribe("backup_interval_minutes", self._on_backup_interval_changed)
+        self.backup_scheduler.stop(final_backup=final_backup)
+        self.store.close()
+        if self._owns_settings:
+            self.settings.close()
+        perf.finish()
@@ -0,0 +1,268 @@
+﻿# exporter.py
+"""
+流式导出
+
+支持五种格式（默认按扩展名判断）:
+
+- text: 按优先级分组的任务列表和统计信息（与原来的 data.export_tasks_as_text 相同）
+- markdown: 与 text 内容相同，任务写成 "- [x] 任务内容" 的清单
+- csv: 每行一个任务，表头为 text、priority、completed、due_date、id（可以用 importer 导回）
+- jsonl: 每行一个 JSON 格式的任务字典
+- json: 任务字典组成的 JSON 数组（每行一个任务）
+
+只遍历一次任务：分组的格式在这一次遍历中同时分组和统计，其余格式边遍历边写出。
+写出的内容先放在缓冲区中，每 chunk_size 行写入文件一次，同时按已写出的任务数更新进度、检查是否取消。
+先写临时文件，完成后再替换目标文件，取消或出错时原文件不受影响。
+"""
+import csv
+import datetime
+import json
+import os
+import re
+import threading
+from model import PRIORITIES
+from stats import StatsAggregator
+from perf import timed
+
+FORMATS = ("text", "markdown", "csv", "jsonl", "json")
+
+EXTENSIONS = {
+    ".txt": "text",
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".json": "json",
+}
+
+# 每次写入文件的行数
+CHUNK_SIZE = 5000
+
+CSV_HEADER = ("text", "priority", "completed", "due_date", "id")
+
+# 只创建一次编码器（json.dumps 带参数时每次调用都会新建）
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+def detect_format(filename):
+    """按扩展名判断导出格式，不认识的扩展名按 text 处理"""
+    return EXTENSIONS.get(os.path.splitext(filename)[1].lower(), "text")
+
+class _Cancelled(Exception):
+    pass
+
+class _Output:
+    """
+    缓冲写入：攒够 chunk_size 行后一次写入文件，同时更新导出任务的进度并检查是否取消
+
+    写出器每写完一个任务调用一次 task_done()，进度按写出的任务数计算。
+    """
+
+    def __init__(self, f, job):
+        self.f = f
+        self.job = job
+        self.tasks = 0  # 已放入缓冲区的任务数
+        self._buffer = []
+
+    def write(self, text):
+        self._buffer.append(text)
+        if len(self._buffer) >= self.job.chunk_size:
+            self.flush()
+
+    def task_done(self):
+        self.tasks += 1
+
+    def flush(self):
+        if self.job.cancelled:
+            raise _Cancelled()
+        self.f.write("".join(self._buffer))
+        self._buffer = []
+        self.job.exported = self.tasks
+        self.job.progress = min(1.0, self.tasks / max(1, self.job.total))
+
+def group_tasks(tasks):
+    """
+    一次遍历按优先级分组并统计
+
+    返回 ([(优先级, 任务列表)], StatsAggregator)，标准优先级按 高、中、低 排在前面，
+    其他优先级按出现顺序排在后面。
+    """
+    groups = {priority: [] for priority in PRIORITIES}
+    stats = StatsAggregator()
+    for task in tasks:
+        group = groups.get(task.priority)
+        if group is None:
+            group = groups[task.priority] = []
+        group.append(task)
+        stats.add(task)
+    return [(priority, group) for priority, group in groups.items() if group], stats
+
+def write_text(out, tasks):
+    groups, stats = group_tasks(tasks)
+    out.write("========== ToDo任务列表 ==========\n")
+    out.write(f"导出时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    out.write(f"总任务数: {stats.total}\n")
+    out.write("================================\n\n")
+    for priority, group in groups:
+        out.write(f"[{priority}优先级] ({len(group)}项)\n")
+        out.write("--------------------------\n")
+        for i, task in enumerate(group, 1):
+            status = "✓" if task.completed else "□"
+            due_date = f" (截止: {task.due_date})" if task.due_date else ""
+            out.write(f"{i}. {status} {task.text}{due_date}\n")
+            out.task_done()
+        out.write("\n")
+
+    result = stats.stats()
+    out.write("========== 统计信息 ==========\n")
+    out.write(f"已完成任务: {result['completed']} ({result['completion_rate']:.1f}%)\n")
+    out.write(f"未完成任务: {result['active']}\n")
+    if result["overdue"]:
+        out.write(f"已过期任务: {result['overdue']}\n")
+
+# 任务内容中有特殊含义的字符加反斜杠转义，换行改为空格
+_MARKDOWN_SPECIAL = re.compile(r"[\\`*_\[\]<>#|\r\n]")
+_MARKDOWN_ESCAPES = {ord(char): "\\" + char for char in "\\`*_[]<>#|"}
+_MARKDOWN_ESCAPES.update({ord("\n"): " ", ord("\r"): None})
+
+def _markdown_text(text):
+    return text.translate(_MARKDOWN_ESCAPES) if _MARKDOWN_SPECIAL.search(text) else text
+
+def write_markdown(out, tasks):
+    groups, stats = group_tasks(tasks)
+    out.write("# ToDo任务列表\n\n")
+    out.write(f"导出时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}，总任务数: {stats.total}\n\n")
+    for priority, group in groups:
+        out.write(f"## {priority}优先级（{len(group)}项）\n\n")
+        for task in group:
+            status = "x" if task.completed else " "
+            due_date = f"（截止: {task.due_date}）" if task.due_date else ""
+            out.write(f"- [{status}] {_markdown_text(task.text)}{due_date}\n")
+            out.task_done()
+        out.write("\n")
+
+    result = stats.stats()
+    out.write("## 统计信息\n\n")
+    out.write(f"- 已完成任务: {result['completed']} ({result['completion_rate']:.1f}%)\n")
+    out.write(f"- 未完成任务: {result['active']}\n")
+    if result["overdue"]:
+        out.write(f"- 已过期任务: {result['overdue']}\n")
+
+def write_csv(out, tasks):
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    for task in tasks:
+        writer.writerow((task.text, task.priority, "true" if task.completed else "false", task.due_date,
+                         "" if task.id is None else task.id))
+        out.task_done()
+
+def write_jsonl(out, tasks):
+    for task in tasks:
+        out.write(_encode_json(task.to_dict()) + "\n")
+        out.task_done()
+
+def write_json(out, tasks):
+    separator = "[\n"
+    for task in tasks:
+        out.write(separator + _encode_json(task.to_dict()))
+        out.task_done()
+        separator = ",\n"
+    out.write("[]\n" if separator == "[\n" else "\n]\n")
+
+WRITERS = {
+    "text": write_text,
+    "markdown": write_markdown,
+    "csv": write_csv,
+    "jsonl": write_jsonl,
+    "json": write_json,
+}
+
+class ExportJob:
+    """
+    把任务列表导出到文件
+
+    run() 在当前线程中导出，start() 在后台线程中导出；cancel() 请求取消，
+    已写出的临时文件被删除，目标文件保持不变。导出过程中可以随时读取:
+
+    - progress: 已写出的任务的比例（0~1）
+    - total / exported: 任务数、已写出的任务数
+    - done / cancelled / error: 是否结束、是否被取消、出错时的异常
+
+    tasks 是任务列表或只能遍历一次的可迭代对象（此时用 total 给出任务数），由导出线程遍历；
+    在后台导出时应当是不会被其他线程修改的副本（例如 TaskStore.iter_snapshot() 复制的任务）。
+    """
+
+    def __init__(self, tasks, filename, file_format=None, chunk_size=CHUNK_SIZE, total=None):
+        self.tasks = tasks
+        self.filename = filename
+        self.format = file_format or detect_format(filename)
+        if self.format not in WRITERS:
+            raise ValueError(f"不支持的导出格式: {self.format}")
+        self.chunk_size = chunk_size
+
+        self.total = len(tasks) if total is None else total
+        self.exported = 0
+        self.progress = 0.0
+        self.error = None
+        self._ok = False  # 目标文件已被替换
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def succeeded(self):
+        """是否已完整写出（写完后才调用的 cancel() 不影响结果）"""
+        return self._ok
+
+    def start(self):
+        """在后台线程中导出，返回自身"""
+        self._thread = threading.Thread(target=self.run, name="ExportJob", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        """等待导出结束，返回是否已结束"""
+        return self._done.wait(timeout)
+
+    @timed("export.run")
+    def run(self):
+        """导出全部任务，返回是否成功；出错时记录在 error 中"""
+        temp_file = self.filename + ".tmp"
+        try:
+            directory = os.path.dirname(self.filename)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            # csv 模块自己处理换行
+            with open(temp_file, "w", encoding="utf-8", newline="" if self.format == "csv" else None) as f:
+                out = _Output(f, self)
+                WRITERS[self.format](out, self.tasks)
+                out.flush()
+            os.replace(temp_file, self.filename)
+            self._ok = True
+            self.progress = 1.0
+        except _Cancelled:
+            os.remove(temp_file)
+        except Exception as e:
+            print(f"导出任务失败: {e}")
+            self.error = e
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+        finally:
+            self._done.set()
+        return self.succeeded
+
+def export_tasks(tasks, filename, file_format=None):
+    """在当前线程中导出任务（格式默认按扩展名判断），返回是否成功"""
+    tasks = tasks if isinstance(tasks, list) else list(tasks)
+    return ExportJob(tasks, filename, file_format).run()
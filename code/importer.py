@@ -0,0 +1,283 @@
+﻿# importer.py
+"""
+流式批量导入
+
+支持四种格式（默认按扩展名判断）:
+
+- text: 每行一个任务，格式为 "[优先级] 任务内容 (截止日期)"，优先级和截止日期都可以省略，
+  以 # 开头的行是注释（与原来的 data.import_from_text 相同）
+- csv: 第一行是表头，按列名找到任务内容、优先级、截止日期、完成状态四列（中英文列名都可以）
+- jsonl: 每行一个 JSON 格式的任务字典（与 export_json / 命令行 query --format json 的输出相同）
+- json: 任务字典组成的 JSON 数组（与任务快照、导出的 JSON 文件相同）
+
+文件逐行（JSON 数组逐个元素）解析，解析出的任务每 chunk_size 个一批加入 TaskStore，
+每批之后等后台保存线程写完再继续，内存占用与文件大小无关。
+截止日期支持 2025-05-01、2025/5/1、2025.5.1、2025年5月1日 等写法，统一转换为 YYYY-MM-DD；
+相同的日期字符串只解析一次。
+"""
+import csv
+import datetime
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+from model import Task, PRIORITIES
+from data import iter_json_array
+from perf import timed
+
+FORMATS = ("text", "csv", "jsonl", "json")
+
+EXTENSIONS = {
+    ".txt": "text",
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".json": "json",
+}
+
+# 每批加入的任务数
+CHUNK_SIZE = 5000
+
+# 优先级的其他写法
+PRIORITY_ALIASES = {
+    "high": "高", "h": "高", "1": "高",
+    "medium": "中", "normal": "中", "m": "中", "2": "中",
+    "low": "低", "l": "低", "3": "低",
+}
+
+# 表示已完成的写法（不区分大小写）
+COMPLETED_VALUES = {"1", "true", "yes", "y", "x", "done", "是", "✓", "√", "已完成", "完成"}
+
+# CSV 列名 → 字段
+CSV_COLUMNS = {
+    "text": "text", "task": "text", "title": "text", "任务": "text", "内容": "text", "任务内容": "text",
+    "priority": "priority", "优先级": "priority",
+    "due_date": "due_date", "due": "due_date", "deadline": "due_date", "截止日期": "due_date", "截止": "due_date",
+    "completed": "completed", "done": "completed", "status": "completed", "完成": "completed",
+    "已完成": "completed", "状态": "completed",
+}
+
+_DATE = re.compile(r"(\d{4})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})\s*日?")
+_TEXT_PRIORITY = re.compile(r"\[(高|中|低)\]\s*")
+
+def detect_format(filename):
+    """按扩展名判断文件格式，不认识的扩展名按 text 处理"""
+    return EXTENSIONS.get(os.path.splitext(filename)[1].lower(), "text")
+
+@lru_cache(maxsize=4096)
+def normalize_date(value):
+    """把各种写法的日期转换为 "YYYY-MM-DD"，空值返回 ""，不是有效日期时返回 None"""
+    value = value.strip()
+    if not value:
+        return ""
+    match = _DATE.fullmatch(value)
+    if match is None:
+        return None
+    try:
+        return datetime.date(*map(int, match.groups())).isoformat()
+    except ValueError:
+        return None
+
+def normalize_priority(value):
+    """标准优先级（"高"、"中"、"低"），不认识的写法按 "中" 处理"""
+    value = str(value or "").strip()
+    if value in PRIORITIES:
+        return value
+    return PRIORITY_ALIASES.get(value.lower(), "中")
+
+def parse_completed(value):
+    """完成状态：布尔值直接使用，字符串按 COMPLETED_VALUES 判断"""
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in COMPLETED_VALUES
+
+def make_task(record):
+    """
+    把解析出的 (内容, 优先级, 完成状态, 截止日期) 转换为任务
+
+    返回 (任务, 截止日期是否有效)；内容为空时任务为 None。
+    截止日期无效时任务没有截止日期。
+    """
+    text, priority, completed, due_date = record
+    text = str(text or "").strip()
+    if not text:
+        return None, True
+    due = normalize_date(str(due_date or ""))
+    return Task(text, normalize_priority(priority), parse_completed(completed), due or ""), due is not None
+
+def _iter_lines(f):
+    """逐行读取以二进制方式打开的文件并解码（去掉开头的 BOM），调用者可以用 f.tell() 计算进度"""
+    first = True
+    for line in f:
+        if first:
+            first = False
+            if line.startswith(b"\xef\xbb\xbf"):
+                line = line[3:]
+        yield line.decode("utf-8", errors="replace")
+
+def parse_text(lines):
+    """解析 text 格式，逐行生成记录；截止日期部分不是有效日期时保留在任务内容中"""
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        priority = "中"
+        match = _TEXT_PRIORITY.match(line)
+        if match:
+            priority = match.group(1)
+            line = line[match.end():]
+
+        due_date = ""
+        if line.endswith(")") and "(" in line:
+            text, date_part = line[:-1].rsplit("(", 1)
+            date_part = date_part.strip()
+            if date_part.startswith("截止"):
+                date_part = date_part[2:].lstrip(":： ")
+            if normalize_date(date_part):
+                line, due_date = text.strip(), date_part
+        yield line, priority, False, due_date
+
+def parse_csv(lines):
+    """解析 csv 格式，第一行为表头；缺少任务内容列时抛出 ValueError"""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = {}
+    for position, name in enumerate(header):
+        field = CSV_COLUMNS.get(name.strip().lower())
+        if field is not None and field not in columns:
+            columns[field] = position
+    if "text" not in columns:
+        raise ValueError("CSV 文件缺少任务内容列（text / 任务 / 内容）")
+
+    positions = [columns.get(field) for field in ("text", "priority", "completed", "due_date")]
+    for row in reader:
+        if not row:
+            continue
+        yield tuple(row[position] if position is not None and position < len(row) else ""
+                    for position in positions)
+
+def _from_dict(item):
+    if not isinstance(item, dict):
+        return None
+    return item.get("text"), item.get("priority"), item.get("completed"), item.get("due_date")
+
+def parse_jsonl(lines):
+    """解析 jsonl 格式，无法解析的行生成 None"""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield _from_dict(json.loads(line))
+        except ValueError:
+            yield None
+
+def iter_records(f, file_format):
+    """
+    从以二进制方式打开的文件中逐个生成 (内容, 优先级, 完成状态, 截止日期)
+
+    无法解析的行生成 None。
+    """
+    if file_format == "json":
+        return (_from_dict(item) for item in iter_json_array(f))
+    parsers = {"text": parse_text, "csv": parse_csv, "jsonl": parse_jsonl}
+    if file_format not in parsers:
+        raise ValueError(f"不支持的导入格式: {file_format}")
+    return parsers[file_format](_iter_lines(f))
+
+def iter_import(filename, file_format=None):
+    """逐个生成文件中的任务（没有 id），跳过无法解析和内容为空的行"""
+    with open(filename, "rb") as f:
+        for record in iter_records(f, file_format or detect_format(filename)):
+            if record is not None:
+                task, _ = make_task(record)
+                if task is not None:
+                    yield task
+
+class ImportJob:
+    """
+    导入一个文件到 TaskStore
+
+    run() 在当前线程中导入，start() 在后台线程中导入；cancel() 请求取消，
+    当前这批不再加入，已经加入的任务保留。导入过程中可以随时读取:
+
+    - progress: 已读取的比例（0~1，按文件字节数计算）
+    - imported / skipped / invalid_dates: 已导入的任务数、跳过的行数、截止日期无效的任务数
+    - done / cancelled / error: 是否结束、是否被取消、出错时的异常
+    """
+
+    def __init__(self, store, filename, file_format=None, chunk_size=CHUNK_SIZE):
+        self.store = store
+        self.filename = filename
+        self.format = file_format or detect_format(filename)
+        self.chunk_size = chunk_size
+
+        self.progress = 0.0
+        self.imported = 0
+        self.skipped = 0
+        self.invalid_dates = 0
+        self.error = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def start(self):
+        """在后台线程中导入，返回自身"""
+        self._thread = threading.Thread(target=self.run, name="ImportJob", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        """等待导入结束，返回是否已结束"""
+        return self._done.wait(timeout)
+
+    def _add_chunk(self, chunk):
+        self.store.add_many(chunk)
+        self.store.flush()  # 每批写完再继续，保存线程的队列不会无限增长
+        self.imported += len(chunk)
+
+    @timed("import.run")
+    def run(self):
+        """导入整个文件，返回导入的任务数；出错时记录在 error 中"""
+        try:
+            size = os.path.getsize(self.filename) or 1
+            chunk = []
+            with open(self.filename, "rb") as f:
+                for record in iter_records(f, self.format):
+                    task = None
+                    if record is not None:
+                        task, valid_date = make_task(record)
+                        if not valid_date:
+                            self.invalid_dates += 1
+                    if task is None:
+                        self.skipped += 1
+                        continue
+                    chunk.append(task)
+                    if len(chunk) >= self.chunk_size:
+                        if self.cancelled:
+                            return self.imported
+                        self._add_chunk(chunk)
+                        chunk = []
+                        self.progress = min(1.0, f.tell() / size)
+            if chunk and not self.cancelled:
+                self._add_chunk(chunk)
+            self.progress = 1.0
+        except Exception as e:
+            print(f"导入任务失败: {e}")
+            self.error = e
+        finally:
+            self._done.set()
+        return self.imported
@@ -0,0 +1,166 @@
+﻿# indexes.py
+from bisect import bisect_left, bisect_right, insort
+from model import NO_DUE
+from perf import timed
+
+class ValueIndex:
+    """按某个字段的取值分组的索引：{取值: 任务 id 集合}"""
+
+    def __init__(self, field):
+        self.field = field
+        self.fields = (field,)  # 该索引依赖的任务字段
+        self._groups = {}
+
+    def build(self, tasks):
+        """根据全部任务重建索引"""
+        self._groups = {}
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task):
+        value = getattr(task, self.field)
+        group = self._groups.get(value)
+        if group is None:
+            group = self._groups[value] = set()
+        group.add(task.id)
+
+    def remove(self, task):
+        self._groups[getattr(task, self.field)].discard(task.id)
+
+    def ids(self, value):
+        """取值为 value 的任务 id 集合（不要修改返回的集合）"""
+        return self._groups.get(value, ())
+
+    def count(self, value):
+        return len(self._groups.get(value, ()))
+
+class DueDateIndex:
+    """
+    按截止日期排序的索引：有序的 (日期序号, id) 列表，另记录没有截止日期的任务
+
+    调用 build() 之前索引不可用（built 为 False），增删改不做任何处理，
+    逐批加载任务时可以等全部读完再一次排序建立。
+    """
+
+    fields = ("due_date",)
+
+    def __init__(self):
+        self.built = False
+        self._entries = []
+        self.no_due = set()
+
+    def build(self, tasks):
+        """根据全部任务重建索引（一次排序，避免逐个插入）"""
+        self._entries = sorted((task.due, task.id) for task in tasks if task.due != NO_DUE)
+        self.no_due = {task.id for task in tasks if task.due == NO_DUE}
+        self.built = True
+
+    def add(self, task):
+        if not self.built:
+            return
+        if task.due == NO_DUE:
+            self.no_due.add(task.id)
+        else:
+            insort(self._entries, (task.due, task.id))
+
+    def remove(self, task):
+        if not self.built:
+            return
+        if task.due == NO_DUE:
+            self.no_due.discard(task.id)
+        else:
+            position = bisect_left(self._entries, (task.due, task.id))
+            if position < len(self._entries) and self._entries[position] == (task.due, task.id):
+                del self._entries[position]
+
+    def _bounds(self, start, end):
+        low = 0 if start is None else bisect_left(self._entries, (start,))
+        high = len(self._entries) if end is None else bisect_right(self._entries, (end, float("inf")))
+        return low, high
+
+    def count(self, start=None, end=None):
+        """截止日期序号在 [start, end] 内的任务数，None 表示不限"""
+        low, high = self._bounds(start, end)
+        return max(0, high - low)
+
+    def ids(self, start=None, end=None):
+        """按截止日期顺序返回 [start, end] 内的任务 id"""
+        low, high = self._bounds(start, end)
+        return [task_id for _, task_id in self._entries[low:high]]
+
+class TextIndex:
+    """
+    任务文本的倒排索引：{字符二元组: 任务 id 集合}
+
+    文本统一转为小写后按相邻两个字符切分（如 "学习os" → "学习"、"习o"、"os"），
+    不依赖空格分词，中文也能检索。只有一个字符的文本以该字符本身作为索引项。
+    查询时取关键词各二元组对应集合的交集，再用子串匹配去掉误报。
+
+    索引在第一次查询时才建立，之前的增删改不做任何处理。
+    """
+
+    fields = ("text",)
+
+    def __init__(self):
+        self.built = False
+        self._postings = {}
+        self._char_grams = {}  # 字符 → 包含该字符的索引项，用于单字符查询
+
+    @staticmethod
+    def grams(text):
+        text = text.lower()
+        if len(text) == 1:
+            return {text}
+        return {text[i:i + 2] for i in range(len(text) - 1)}
+
+    @timed("search.build_text_index")
+    def build(self, tasks):
+        """根据全部任务建立索引"""
+        self._postings = {}
+        self._char_grams = {}
+        self.built = True
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task):
+        if not self.built:
+            return
+        for gram in self.grams(task.text):
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = set()
+                for char in set(gram):
+                    self._char_grams.setdefault(char, set()).add(gram)
+            posting.add(task.id)
+
+    def remove(self, task):
+        if not self.built:
+            return
+        for gram in self.grams(task.text):
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            posting.discard(task.id)
+            if not posting:
+                del self._postings[gram]
+                for char in set(gram):
+                    self._char_grams[char].discard(gram)
+
+    def candidates(self, keyword):
+        """
+        返回 (候选数量上限, 取出候选 id 的函数)
+
+        候选集合包含所有文本中含有 keyword（不区分大小写）的任务，可能有少量误报。
+        """
+        keyword = keyword.lower()
+        if len(keyword) == 1:
+            postings = [self._postings[gram] for gram in self._char_grams.get(keyword, ())]
+            return sum(len(posting) for posting in postings), lambda: set().union(*postings)
+
+        postings = [self._postings.get(gram) for gram in self.grams(keyword)]
+        if not all(postings):
+            return 0, lambda: ()
+        postings.sort(key=len)
+        smallest, others = postings[0], postings[1:]
+        return len(smallest), lambda: [task_id for task_id in smallest
+                                       if all(task_id in posting for posting in others)]
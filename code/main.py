@@ -43,7 +43,7 @@ def main():
     
     # 程序关闭前的确认
     def on_closing():
-        if len(app.tasks) > 0:
+        if len(app.engine) > 0:
             if tk.messagebox.askyesno("确认", "是否要退出应用？\n您的数据已自动保存。"):
                 root.destroy()
         else:
@@ -51,6 +51,9 @@ def main():
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
     root.mainloop()
+    
+    # 关闭窗口或从菜单退出后，写完未保存的修改（自动备份在后台完成）
+    app.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
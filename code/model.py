@@ -0,0 +1,222 @@
+﻿# model.py
+import datetime
+import sys
+from array import array
+from functools import lru_cache
+
+# 没有截止日期（或日期格式错误）时 due 的取值
+NO_DUE = 0
+
+# 标准优先级及其排序序号
+PRIORITIES = ("高", "中", "低")
+PRIORITY_RANK = {"高": 0, "中": 1, "低": 2}
+
+# 任务在 JSON 中的字段（按保存顺序）
+TASK_FIELDS = ("text", "priority", "completed", "due_date", "id")
+
+@lru_cache(maxsize=4096)
+def parse_due_date(due_date):
+    """把 "YYYY-MM-DD" 格式的截止日期解析为日期序号（date.toordinal），无效时返回 NO_DUE"""
+    if not due_date:
+        return NO_DUE
+    try:
+        return datetime.date.fromisoformat(due_date).toordinal()
+    except (TypeError, ValueError):
+        return NO_DUE
+
+def format_due_date(due):
+    """把日期序号还原为 "YYYY-MM-DD" 字符串"""
+    if due == NO_DUE:
+        return ""
+    return datetime.date.fromordinal(due).isoformat()
+
+def today_ordinal():
+    """今天的日期序号"""
+    return datetime.date.today().toordinal()
+
+class Task:
+    """
+    任务
+
+    使用 __slots__ 保存字段，不再为每个任务分配一个字典；优先级和截止日期字符串
+    都被驻留（intern），相同的值在所有任务间共享。due 属性缓存解析好的截止日期序号，
+    设置 due_date 时自动更新。JSON 中不认识的字段保存在 extra 中，转换回字典时原样写出。
+    """
+
+    __slots__ = ("id", "text", "priority", "completed", "_due_date", "due", "extra")
+
+    def __init__(self, text="", priority="中", completed=False, due_date="", id=None, extra=None):
+        self.id = id
+        self.text = text
+        self.priority = sys.intern(priority)
+        self.completed = completed
+        self.due_date = due_date
+        self.extra = extra
+
+    @property
+    def due_date(self):
+        return self._due_date
+
+    @due_date.setter
+    def due_date(self, value):
+        value = sys.intern(value or "")
+        self._due_date = value
+        self.due = parse_due_date(value)
+
+    @classmethod
+    def from_dict(cls, data):
+        """从 JSON 格式的任务字典创建任务"""
+        extra = {key: value for key, value in data.items() if key not in TASK_FIELDS} or None
+        return cls(data.get("text", ""), data.get("priority", "中"), data.get("completed", False),
+                   data.get("due_date", ""), data.get("id"), extra)
+
+    def to_dict(self):
+        """转换为 JSON 格式的任务字典"""
+        data = {
+            "text": self.text,
+            "priority": self.priority,
+            "completed": self.completed,
+            "due_date": self._due_date,
+        }
+        if self.id is not None:
+            data["id"] = self.id
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def copy(self):
+        """返回任务的副本（extra 复制一层），比经过 to_dict / from_dict 快"""
+        task = Task.__new__(Task)
+        task.id = self.id
+        task.text = self.text
+        task.priority = self.priority
+        task.completed = self.completed
+        task._due_date = self._due_date
+        task.due = self.due
+        task.extra = dict(self.extra) if self.extra else self.extra
+        return task
+
+    def update(self, **fields):
+        """修改若干字段"""
+        for key, value in fields.items():
+            setattr(self, key, value)
+
+    def __repr__(self):
+        return f"Task({self.to_dict()!r})"
+
+class TaskTable:
+    """
+    列式任务表：每个字段一列，适合一次性处理大量任务
+
+    - priorities: bytearray，保存优先级在 priority_names 中的序号
+    - completed: bytearray，0/1
+    - dues: array('i')，截止日期序号
+    - ids: array('q')，任务 id（没有 id 时为 0）
+
+    无法由日期序号还原的截止日期字符串、以及 JSON 中的其他字段分别保存在
+    raw_due_dates 和 extras 两个按行号索引的字典中，与 JSON 格式互相转换时不丢失信息。
+    """
+
+    def __init__(self):
+        self.ids = array("q")
+        self.texts = []
+        self.priority_names = list(PRIORITIES)
+        self.priorities = bytearray()
+        self.completed = bytearray()
+        self.dues = array("i")
+        self.raw_due_dates = {}
+        self.extras = {}
+        self._priority_codes = {name: code for code, name in enumerate(self.priority_names)}
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __iter__(self):
+        for row in range(len(self.texts)):
+            yield self[row]
+
+    def to_tasks(self, start=0, end=None):
+        """把第 start 到 end 行转换为 Task 列表，按列整段取出，比逐行 self[row] 快得多"""
+        end = len(self.texts) if end is None else end
+        texts = self.texts.tolist(start, end) if hasattr(self.texts, "tolist") else self.texts[start:end]
+        names = self.priority_names
+        raw_due_dates = self.raw_due_dates
+        extras = self.extras
+        due_dates = {}  # 日期序号 → 字符串，相同的日期只格式化一次
+
+        tasks = []
+        columns = zip(self.ids[start:end].tolist(), texts, self.priorities[start:end],
+                      self.completed[start:end], self.dues[start:end].tolist())
+        for row, (task_id, text, priority, completed, due) in enumerate(columns, start):
+            due_date = raw_due_dates.get(row)
+            if due_date is None:
+                due_date = due_dates.get(due)
+                if due_date is None:
+                    due_date = due_dates[due] = format_due_date(due)
+            tasks.append(Task(text, names[priority], bool(completed), due_date, task_id or None, extras.get(row)))
+        return tasks
+
+    def __getitem__(self, row):
+        """取出第 row 行，返回 Task"""
+        due_date = self.raw_due_dates.get(row)
+        if due_date is None:
+            due_date = format_due_date(self.dues[row])
+        return Task(self.texts[row], self.priority_names[self.priorities[row]], bool(self.completed[row]),
+                    due_date, self.ids[row] or None, self.extras.get(row))
+
+    def _priority_code(self, name):
+        code = self._priority_codes.get(name)
+        if code is None:
+            code = len(self.priority_names)
+            self.priority_names.append(name)
+            self._priority_codes[name] = code
+        return code
+
+    def append(self, task):
+        """追加一个 Task"""
+        row = len(self.texts)
+        self.ids.append(task.id or 0)
+        self.texts.append(task.text)
+        self.priorities.append(self._priority_code(task.priority))
+        self.completed.append(1 if task.completed else 0)
+        self.dues.append(task.due)
+        if format_due_date(task.due) != task.due_date:
+            self.raw_due_dates[row] = task.due_date
+        if task.extra:
+            self.extras[row] = task.extra
+
+    @classmethod
+    def from_columns(cls, ids, texts, priority_names, priorities, completed, dues, raw_due_dates=None, extras=None):
+        """
+        由已有的各列直接创建（不复制数据）
+
+        各列只需支持 len() 和按下标取值，例如映射到文件的 memoryview；
+        这样创建的表通常是只读的，不能再 append。
+        """
+        table = cls()
+        table.ids = ids
+        table.texts = texts
+        table.priority_names = list(priority_names)
+        table.priorities = priorities
+        table.completed = completed
+        table.dues = dues
+        table.raw_due_dates = raw_due_dates or {}
+        table.extras = extras or {}
+        table._priority_codes = {name: code for code, name in enumerate(table.priority_names)}
+        return table
+
+    @classmethod
+    def from_tasks(cls, tasks):
+        table = cls()
+        for task in tasks:
+            table.append(task)
+        return table
+
+    @classmethod
+    def from_dicts(cls, items):
+        """从 JSON 格式的任务字典列表创建"""
+        return cls.from_tasks(Task.from_dict(item) for item in items)
+
+    def to_dicts(self):
+        """转换为 JSON 格式的任务字典列表"""
+        return [task.to_dict() for task in self]
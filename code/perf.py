@@ -0,0 +1,300 @@
+﻿# perf.py
+import cProfile
+import collections
+import functools
+import os
+import sys
+import threading
+import time
+
+# 每个计时项保留最近的样本数，p50/p99 按这些样本计算
+MAX_SAMPLES = 2000
+
+# 环境变量：YATTODO_PERF=1 开启性能统计；YATTODO_PERF_PROFILE=路径前缀 记录整个会话，
+# 退出时写出 <前缀>.prof（cProfile）和 <前缀>.folded（火焰图折叠栈）
+ENV_ENABLED = "YATTODO_PERF"
+ENV_PROFILE = "YATTODO_PERF_PROFILE"
+
+class _Series:
+    """一个计时项：总次数、总耗时、最大值和最近的样本"""
+
+    __slots__ = ("count", "total_ms", "max_ms", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = collections.deque(maxlen=MAX_SAMPLES)
+
+def percentile(sorted_values, fraction):
+    """已排序的样本中第 fraction（0~1）分位的值"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+class PerfRecorder:
+    """
+    计时和计数的记录器（线程安全）
+
+    计时项记录每次的耗时（毫秒），计数项只累加次数，名称如 "store.query"、"storage.write"。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._counters = collections.Counter()
+
+    def record(self, name, ms):
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = _Series()
+            series.count += 1
+            series.total_ms += ms
+            if ms > series.max_ms:
+                series.max_ms = ms
+            series.samples.append(ms)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+            self._counters = collections.Counter()
+
+    def report(self):
+        """
+        返回 (计时项列表, 计数项字典)
+
+        计时项按总耗时从大到小排列，每项为字典:
+        name、count、total_ms、avg_ms、p50_ms、p99_ms、max_ms
+        """
+        with self._lock:
+            series = [(name, s.count, s.total_ms, s.max_ms, sorted(s.samples)) for name, s in self._series.items()]
+            counters = dict(self._counters)
+        rows = []
+        for name, count, total_ms, max_ms, samples in series:
+            rows.append({
+                "name": name,
+                "count": count,
+                "total_ms": total_ms,
+                "avg_ms": total_ms / count if count else 0.0,
+                "p50_ms": percentile(samples, 0.5),
+                "p99_ms": percentile(samples, 0.99),
+                "max_ms": max_ms,
+            })
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows, counters
+
+# 关闭时为 None，各处的计时只多一次判断
+_recorder = None
+_profiler = None
+_session_profile = None  # 整个会话的分析结果写到这个路径前缀
+_watching = False  # 是否在监测事件循环
+
+def enabled():
+    """是否开启了性能统计"""
+    return _recorder is not None
+
+def enable():
+    """开启性能统计"""
+    global _recorder
+    if _recorder is None:
+        _recorder = PerfRecorder()
+
+def disable():
+    """关闭性能统计并丢弃已记录的数据"""
+    global _recorder
+    _recorder = None
+
+def configure(settings=None):
+    """按环境变量和配置项 perf_enabled 开启性能统计；设置了 YATTODO_PERF_PROFILE 时开始记录整个会话"""
+    global _session_profile
+    flag = os.environ.get(ENV_ENABLED, "").strip().lower()
+    if flag in ("1", "true", "yes", "on") or (settings is not None and settings.get("perf_enabled")):
+        enable()
+    prefix = os.environ.get(ENV_PROFILE)
+    if prefix and _profiler is None:
+        enable()
+        _session_profile = prefix
+        start_profile()
+
+def finish():
+    """结束会话：如果在记录整个会话，写出分析结果"""
+    global _session_profile
+    if _session_profile and _profiler is not None:
+        try:
+            files = stop_profile(_session_profile)
+            print(f"性能分析已保存: {', '.join(files)}", file=sys.stderr)
+        except Exception as e:
+            print(f"保存性能分析失败: {e}")
+    _session_profile = None
+
+def record(name, ms):
+    """记录一次耗时（毫秒）"""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.record(name, ms)
+
+def count(name, n=1):
+    """计数项 name 加 n"""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.count(name, n)
+
+def report():
+    """返回 (计时项列表, 计数项字典)，未开启时都为空"""
+    recorder = _recorder
+    return recorder.report() if recorder is not None else ([], {})
+
+def reset():
+    recorder = _recorder
+    if recorder is not None:
+        recorder.reset()
+
+class timer:
+    """
+    计时的上下文管理器:
+
+        with perf.timer("store.query"):
+            ...
+
+    未开启性能统计时不计时。
+    """
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if _recorder is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.start is not None:
+            record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+def timed(name):
+    """计时的装饰器，每次调用记录一次耗时；未开启时直接调用原函数"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _recorder
+            if recorder is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                recorder.record(name, (time.perf_counter() - start) * 1000)
+        return wrapper
+    return decorate
+
+def watch_event_loop(widget, interval_ms=50, stall_ms=200):
+    """
+    监测 Tk 事件循环的卡顿
+
+    每隔 interval_ms 用 widget.after 安排一次回调，实际执行时间比预期晚多少就是主循环
+    被阻塞的时间，记为 "ui.event_loop_lag"；超过 stall_ms 的另外记为 "ui.stall" 并计数。
+    关闭性能统计后停止；已经在监测时不重复开始。
+    """
+    global _watching
+
+    def tick(expected):
+        global _watching
+        if _recorder is None:
+            _watching = False
+            return
+        now = time.perf_counter()
+        lag = max(0.0, (now - expected) * 1000)
+        record("ui.event_loop_lag", lag)
+        if lag >= stall_ms:
+            record("ui.stall", lag)
+            count("ui.stalls")
+        widget.after(interval_ms, tick, time.perf_counter() + interval_ms / 1000)
+
+    if _recorder is not None and not _watching:
+        _watching = True
+        widget.after(interval_ms, tick, time.perf_counter() + interval_ms / 1000)
+
+class StackSampler:
+    """
+    调用栈采样
+
+    后台线程每隔 interval 秒取一次目标线程（默认主线程）的调用栈并计数，
+    dump() 写出 flamegraph.pl、speedscope 等工具可以读取的折叠栈格式
+    （每行 "外层;...;内层 次数"）。
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.main_thread().ident
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="StackSampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    @staticmethod
+    def _label(code):
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _run(self):
+        labels = {}  # 代码对象 → 显示名称
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = self._label(code)
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump(self, filename):
+        with open(filename, "w", encoding="utf-8") as f:
+            for stack, samples in self.stacks.most_common():
+                f.write(f"{stack} {samples}\n")
+
+def profiling():
+    """是否正在记录 cProfile 和调用栈"""
+    return _profiler is not None
+
+def start_profile():
+    """在当前线程开始 cProfile，同时对当前线程做调用栈采样"""
+    global _profiler
+    if _profiler is not None:
+        return
+    profile = cProfile.Profile()
+    sampler = StackSampler(thread_id=threading.get_ident())
+    sampler.start()
+    profile.enable()
+    _profiler = (profile, sampler)
+
+def stop_profile(prefix):
+    """停止记录，写出 <prefix>.prof 和 <prefix>.folded，返回写出的文件名"""
+    global _profiler
+    if _profiler is None:
+        return []
+    profile, sampler = _profiler
+    _profiler = None
+    profile.disable()
+    sampler.stop()
+    profile.dump_stats(prefix + ".prof")
+    sampler.dump(prefix + ".folded")
+    return [prefix + ".prof", prefix + ".folded"]
@@ -0,0 +1,129 @@
+﻿# snapshot.py
+import json
+import mmap
+import struct
+import sys
+from array import array
+from model import TaskTable
+
+# 二进制快照文件格式（文件头为小端，各列按写入时机器的字节序保存，由 flags 标明）:
+#
+#   文件头    MAGIC, 版本, flags, 任务数 n, 文本区字节数, 附加信息字节数
+#   ids       n 个 int64
+#   offsets   n + 1 个 uint64，第 i 个任务的文本为 texts[offsets[i]:offsets[i + 1]]
+#   dues      n 个 int32，截止日期序号
+#   priorities n 个 uint8，优先级在 priority_names 中的序号
+#   completed n 个 uint8
+#   texts     所有任务文本的 UTF-8 编码依次拼接（字符串表）
+#   meta      UTF-8 JSON: priority_names、raw_due_dates、extras（见 model.TaskTable）
+#
+# 8 字节的列排在前面，各列都按自身大小对齐，映射到内存后可以直接当作数组使用。
+MAGIC = b"YATTODO\x00"
+VERSION = 1
+FLAG_BIG_ENDIAN = 1
+HEADER = struct.Struct("<8sIIQQQ")
+
+def is_binary_snapshot(filename):
+    """判断文件是否为二进制快照"""
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def write_binary_snapshot(tasks, f):
+    """把任务写入以二进制方式打开的文件"""
+    table = tasks if isinstance(tasks, TaskTable) else TaskTable.from_tasks(tasks)
+    count = len(table)
+
+    encoded = [text.encode("utf-8") for text in table.texts]
+    offsets = array("Q", [0])
+    position = 0
+    for data in encoded:
+        position += len(data)
+        offsets.append(position)
+
+    meta = json.dumps({
+        "priority_names": table.priority_names,
+        "raw_due_dates": {str(row): value for row, value in table.raw_due_dates.items()},
+        "extras": {str(row): value for row, value in table.extras.items()},
+    }, ensure_ascii=False).encode("utf-8")
+
+    flags = FLAG_BIG_ENDIAN if sys.byteorder == "big" else 0
+    f.write(HEADER.pack(MAGIC, VERSION, flags, count, position, len(meta)))
+    f.write(array("q", table.ids).tobytes())
+    f.write(offsets.tobytes())
+    f.write(array("i", table.dues).tobytes())
+    f.write(bytes(table.priorities))
+    f.write(bytes(table.completed))
+    f.write(b"".join(encoded))
+    f.write(meta)
+
+class StringTable:
+    """字符串表：按下标取出文本，取值时才解码"""
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return str(self.data[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def tolist(self, start=0, end=None):
+        """一次取出第 start 到 end 个文本"""
+        end = len(self) if end is None else end
+        offsets = self.offsets[start:end + 1].tolist()
+        base = offsets[0]
+        data = bytes(self.data[base:offsets[-1]])
+        return [data[first - base:last - base].decode("utf-8") for first, last in zip(offsets, offsets[1:])]
+
+def load_binary_snapshot(filename):
+    """
+    把二进制快照映射到内存，返回只读的 TaskTable
+
+    各列直接引用映射的内存，不复制数据；文本在取出时才解码。
+    表（及其各列）不再被引用后映射自动解除。
+    """
+    with open(filename, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    magic, version, flags, count, text_size, meta_size = HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("不支持的快照格式")
+    native = (flags & FLAG_BIG_ENDIAN) == (sys.byteorder == "big")
+
+    position = HEADER.size
+
+    def column(typecode, length):
+        nonlocal position
+        size = array(typecode).itemsize * length
+        data = view[position:position + size]
+        position += size
+        if native:
+            return data.cast(typecode)
+        # 字节序不同时复制一份并转换
+        values = array(typecode, data.tobytes())
+        values.byteswap()
+        return values
+
+    ids = column("q", count)
+    offsets = column("Q", count + 1)
+    dues = column("i", count)
+    priorities = view[position:position + count]
+    completed = view[position + count:position + 2 * count]
+    position += 2 * count
+    texts = StringTable(view[position:position + text_size], offsets)
+    position += text_size
+    meta = json.loads(str(view[position:position + meta_size], "utf-8"))
+
+    return TaskTable.from_columns(
+        ids, texts, meta["priority_names"], priorities, completed, dues,
+        {int(row): value for row, value in meta["raw_due_dates"].items()},
+        {int(row): value for row, value in meta["extras"].items()})
@@ -0,0 +1,216 @@
+﻿# sorting.py
+import datetime
+from bisect import bisect_left
+from model import NO_DUE, PRIORITY_RANK
+from perf import timed
+
+MAX_DUE = datetime.date.max.toordinal()
+MIN_DUE = datetime.date.min.toordinal()
+
+# 排序键都是整数元组，倒序时把各项取负，不需要 reverse=True；
+# 相同键的任务保持原来的相对顺序（与 list.sort 的稳定排序一致）
+
+def priority_key(reverse=False):
+    """按优先级排序：未完成的在前，组内按 高 → 中 → 低（倒序时整体反过来）"""
+    if reverse:
+        return lambda task: (-task.completed, -PRIORITY_RANK.get(task.priority, 1))
+    return lambda task: (int(task.completed), PRIORITY_RANK.get(task.priority, 1))
+
+def date_key(reverse=False):
+    """按截止日期排序：已完成和没有截止日期的在最后（倒序时已完成的在前、没有截止日期的在最后）"""
+    if reverse:
+        return lambda task: (-(MAX_DUE if task.completed else MIN_DUE if task.due == NO_DUE else task.due),)
+    return lambda task: (MAX_DUE if task.completed or task.due == NO_DUE else task.due,)
+
+# 排序方式 → (排序键工厂, 排序键依赖的任务字段)
+SORT_TYPES = {
+    "priority": (priority_key, ("completed", "priority")),
+    "date": (date_key, ("completed", "due_date")),
+}
+
+def sort_key(sort_type, reverse=False):
+    """返回排序方式 sort_type 的排序键函数"""
+    return SORT_TYPES[sort_type][0](reverse)
+
+@timed("sort.sort_tasks")
+def sort_tasks(tasks, sort_type, reverse=False):
+    """返回排好序的新列表，sort_type 为 "none" 时保持原顺序，也可以是 SortSpec"""
+    if isinstance(sort_type, SortSpec):
+        return sort_type.sort(tasks)
+    if sort_type == "none":
+        return list(tasks)
+    return sorted(tasks, key=sort_key(sort_type, reverse))
+
+# 把文本倒序比较：UTF-32-BE 编码后每个字节取反（255 - b），
+# 末尾的 5 个 0xff 比任何取反后的字符都大，保证较长的文本排在它的前缀之前
+_INVERT = bytes(range(255, -1, -1))
+_INVERTED_END = b"\xff" * 5
+
+def _text_descending(text):
+    return text.casefold().encode("utf-32-be").translate(_INVERT) + _INVERTED_END
+
+# 自定义排序字段 → (名称, 升序键, 降序键, 依赖的任务字段)
+# 各字段的键都是可以直接比较的整数、字符串或字节串；没有截止日期的任务两个方向都排在最后，
+# 创建时间用 id 表示（id 按添加顺序递增）
+SORT_FIELDS = {
+    "priority": ("优先级",
+                 lambda task: PRIORITY_RANK.get(task.priority, 1),
+                 lambda task: -PRIORITY_RANK.get(task.priority, 1),
+                 ("priority",)),
+    "due": ("截止日期",
+            lambda task: MAX_DUE if task.due == NO_DUE else task.due,
+            lambda task: 0 if task.due == NO_DUE else -task.due,
+            ("due_date",)),
+    "completed": ("完成状态",
+                  lambda task: int(task.completed),
+                  lambda task: -task.completed,
+                  ("completed",)),
+    "text": ("内容",
+             lambda task: task.text.casefold(),
+             lambda task: _text_descending(task.text),
+             ("text",)),
+    "created": ("创建时间",
+                lambda task: task.id or 0,
+                lambda task: -(task.id or 0),
+                ()),
+}
+
+class SortSpec:
+    """
+    自定义排序：有序的 (字段, 是否降序) 列表，字段见 SORT_FIELDS
+
+    排序键编译为元组，每个字段一项；前面的字段相同时比较后面的字段，
+    全部相同时按创建顺序（id）排列，顺序总是确定的。
+    可以用字符串表示，如 "completed,priority,due:desc"（默认升序）。
+
+    SortSpec 可以作为字典的键，TaskStore 为每种排序维护一个 SortedView，
+    每个任务的排序键只计算一次并缓存；一次性排序的列表用 sort()。
+    """
+
+    def __init__(self, keys=()):
+        self.keys = tuple((field, bool(descending)) for field, descending in keys)
+        names = [field for field, _ in self.keys]
+        for field in names:
+            if field not in SORT_FIELDS:
+                raise ValueError(f"未知的排序字段: {field}")
+        if len(set(names)) != len(names):
+            raise ValueError("排序字段重复")
+        self._getters = [SORT_FIELDS[field][2 if descending else 1] for field, descending in self.keys]
+        # sort() 用的各趟排序 (键, 是否 reverse)；文本倒序直接对升序键 reverse，不必编码
+        self._passes = [(SORT_FIELDS[field][1], True) if field == "text" and descending else (getter, False)
+                        for (field, descending), getter in zip(self.keys, self._getters)]
+
+    @classmethod
+    def parse(cls, text):
+        """从 "字段[:asc|:desc],..." 格式的字符串创建"""
+        keys = []
+        for part in text.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            field, _, direction = part.partition(":")
+            direction = direction.strip().lower() or "asc"
+            if direction not in ("asc", "desc"):
+                raise ValueError(f"未知的排序方向: {direction}")
+            keys.append((field.strip(), direction == "desc"))
+        return cls(keys)
+
+    def __str__(self):
+        return ",".join(f"{field}:desc" if descending else field for field, descending in self.keys)
+
+    def __repr__(self):
+        return f"SortSpec({str(self)!r})"
+
+    def __bool__(self):
+        return bool(self.keys)
+
+    def __eq__(self, other):
+        return isinstance(other, SortSpec) and self.keys == other.keys
+
+    def __hash__(self):
+        return hash(self.keys)
+
+    @property
+    def fields(self):
+        """排序键依赖的任务字段"""
+        return tuple({name for field, _ in self.keys for name in SORT_FIELDS[field][3]})
+
+    def label(self):
+        """界面上显示的说明，如：优先级↑ 截止日期↓"""
+        return " ".join(SORT_FIELDS[field][0] + ("↓" if descending else "↑") for field, descending in self.keys)
+
+    def key(self, task):
+        """单个任务的排序键"""
+        return tuple([getter(task) for getter in self._getters])
+
+    def decorate(self, tasks):
+        """一次计算全部任务的排序键：每个字段整列计算后再组合成元组"""
+        return list(zip(*[map(getter, tasks) for getter in self._getters])) if self._getters else [()] * len(tasks)
+
+    @timed("sort.sort_spec")
+    def sort(self, tasks):
+        """
+        返回排好序的新列表，相同键的任务按 id 排列
+
+        先按 id 排序，再从最后一个字段到第一个字段各做一次稳定排序。每趟只比较单个整数或字符串，
+        比一次比较整个元组快得多（20 万个任务、三个字段约快 3 倍）。
+        """
+        result = sorted(tasks, key=SORT_FIELDS["created"][1])
+        for key, reverse in reversed(self._passes):
+            result.sort(key=key, reverse=reverse)
+        return result
+
+class SortedView:
+    """
+    始终保持有序的任务视图
+
+    保存 (排序键, id) 的有序列表和对应的任务列表，每个任务的排序键只计算一次并缓存。
+    增删改时用二分查找定位，不需要重新排序全部任务。接口与 indexes.py 中的索引相同
+    （fields、build、add、remove），可以直接由 TaskStore 在修改时维护。
+    """
+
+    def __init__(self, key, fields, decorate=None):
+        self.key = key
+        self.fields = fields
+        self.decorate = decorate  # 一次计算多个任务排序键的函数（可选），建立视图时使用
+        self._keys = []  # 有序的 (排序键, id)
+        self._tasks = []  # 与 _keys 一一对应
+        self._task_keys = {}  # id → (排序键, id)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __iter__(self):
+        return iter(self._tasks)
+
+    def tasks(self):
+        """按顺序返回全部任务（新列表）"""
+        return list(self._tasks)
+
+    def key_of(self, task):
+        """任务缓存的排序键，可用于对部分任务排序"""
+        return self._task_keys[task.id]
+
+    def build(self, tasks):
+        """一次排序建立视图"""
+        tasks = list(tasks)
+        keys = self.decorate(tasks) if self.decorate else map(self.key, tasks)
+        decorated = sorted(zip(zip(keys, [task.id for task in tasks]), tasks))
+        self._keys = [entry for entry, _ in decorated]
+        self._tasks = [task for _, task in decorated]
+        self._task_keys = {entry[1]: entry for entry in self._keys}
+
+    def add(self, task):
+        entry = (self.key(task), task.id)
+        position = bisect_left(self._keys, entry)
+        self._keys.insert(position, entry)
+        self._tasks.insert(position, task)
+        self._task_keys[task.id] = entry
+
+    def remove(self, task):
+        entry = self._task_keys.pop(task.id, None)
+        if entry is None:
+            return
+        position = bisect_left(self._keys, entry)
+        del self._keys[position]
+        del self._tasks[position]
@@ -0,0 +1,213 @@
+﻿# sqlite_storage.py
+import json
+import os
+import sqlite3
+import threading
+from model import Task, TASK_FIELDS
+from perf import timed
+
+# 任务表中单独成列的字段，其余字段以 JSON 保存在 extra 列中
+COLUMNS = ("text", "priority", "completed", "due_date")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    completed INTEGER NOT NULL,
+    due_date TEXT NOT NULL,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(priority);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks(completed);
+CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class SqliteStorage:
+    """
+    SQLite 任务存储，与 data.JsonStorage 接口相同
+
+    每个任务一行，按 id 主键存取；启动时只需读取表中的行，不必解析整个 JSON 文件，
+    修改一个任务只执行一条单行 INSERT/UPDATE/DELETE。数据库使用 WAL 日志模式，
+    写入不阻塞读取，一批记录在同一个事务中提交。
+
+    meta 表中的 next_id 记录用过的最大 id 加一，与任务在同一个事务中更新，
+    已删除任务的 id 不会再分配给新任务。
+    """
+
+    def __init__(self, filename="tasks.db"):
+        self.filename = filename
+        directory = os.path.dirname(filename)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # 写入在后台保存线程中进行，连接由锁保护
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self.load_progress = 0.0
+        self.next_id = 1
+
+    @timed("storage.load")
+    def load(self):
+        """按 id 顺序读取全部任务"""
+        return list(self.iter_load())
+
+    def iter_load(self, batch_size=1000):
+        """按 id 顺序逐个读取任务，每次从数据库取出 batch_size 行"""
+        with self._lock:
+            max_id = self._conn.execute("SELECT MAX(id) FROM tasks").fetchone()[0] or 0
+            self.next_id = max(self._stored_next_id(), max_id + 1)
+            total = self._conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] or 1
+            cursor = self._conn.execute(
+                "SELECT id, text, priority, completed, due_date, extra FROM tasks ORDER BY id")
+        loaded = 0
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for task_id, text, priority, completed, due_date, extra in rows:
+                yield Task(text, priority, bool(completed), due_date, task_id, json.loads(extra) if extra else None)
+            loaded += len(rows)
+            self.load_progress = loaded / total
+        self.load_progress = 1.0
+
+    def write_records(self, records):
+        """在一个事务中应用一批日志记录（格式见 data.add_record 等）"""
+        with self._lock, self._conn:
+            max_id = 0
+            for record in records:
+                op = record["op"]
+                if op == "add":
+                    task = Task.from_dict(record["task"])
+                    self._insert(task)
+                    max_id = max(max_id, task.id or 0)
+                elif op == "update":
+                    self._update(record["id"], record["fields"])
+                elif op == "delete":
+                    # 新增后又删除的任务合并后只剩删除记录，它的 id 也算用过
+                    self._conn.execute("DELETE FROM tasks WHERE id = ?", (record["id"],))
+                    max_id = max(max_id, record["id"])
+            self._raise_next_id(max_id + 1)
+
+    @timed("storage.save")
+    def save(self, tasks):
+        """用完整的任务列表替换表中的全部任务"""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM tasks")
+                max_id = 0
+                for task in tasks:
+                    self._insert(task)
+                    max_id = max(max_id, task.id or 0)
+                self._raise_next_id(max_id + 1)
+            return True
+        except sqlite3.Error as e:
+            print(f"保存任务失败: {e}")
+            return False
+
+    def _insert(self, task):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO tasks (id, text, priority, completed, due_date, extra) VALUES (?, ?, ?, ?, ?, ?)",
+            (task.id, task.text, task.priority, int(task.completed), task.due_date,
+             json.dumps(task.extra, ensure_ascii=False) if task.extra else None))
+
+    def _update(self, task_id, fields):
+        columns = [key for key in fields if key in COLUMNS]
+        if columns:
+            values = [int(fields[key]) if key == "completed" else fields[key] for key in columns]
+            assignments = ", ".join(f"{key} = ?" for key in columns)
+            self._conn.execute(f"UPDATE tasks SET {assignments} WHERE id = ?", (*values, task_id))
+
+        # 不单独成列的字段合并进 extra
+        others = {key: value for key, value in fields.items() if key not in TASK_FIELDS}
+        if others:
+            row = self._conn.execute("SELECT extra FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            if row is not None:
+                extra = dict(json.loads(row[0]) if row[0] else {}, **others)
+                self._conn.execute("UPDATE tasks SET extra = ? WHERE id = ?",
+                                   (json.dumps(extra, ensure_ascii=False), task_id))
+
+    def is_empty(self):
+        """表中是否没有任务（只查询一行，不读取任务）"""
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM tasks LIMIT 1").fetchone() is None
+
+    def _stored_next_id(self):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+        return int(row[0]) if row else 1
+
+    def _raise_next_id(self, next_id):
+        """在当前事务中把 meta 表的 next_id 提高到 next_id（不会减小）"""
+        if next_id > self._stored_next_id():
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)", (str(next_id),))
+
+    def reserve_ids(self, next_id):
+        """保证之后分配的 id 不小于 next_id（例如迁移时沿用 JSON 存储用过的 id）"""
+        with self._lock, self._conn:
+            self._raise_next_id(next_id)
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def migrate_from_json(storage, json_file="tasks.json", backup_dir="backups"):
+    """
+    把 JSON 格式的任务导入 SQLite 存储（只执行一次）
+
+    优先使用 tasks.json（连同尚未合并的追加日志），它不存在或为空时
+    使用 backup_dir 中最新的一个可读的备份。原有的文件保持不变。
+    返回导入的任务数，已经迁移过或数据库中已有任务时返回 0。
+    """
+    from data import load_task_index, assign_task_ids, stored_next_id, TaskJournal
+    from backup import BackupRepository
+
+    if storage.get_meta("migrated_from") is not None or not storage.is_empty():
+        return 0
+
+    source = None
+    tasks = []
+    next_id = 1
+    try:
+        if os.path.exists(json_file):
+            log_files = TaskJournal.pending_logs(json_file)
+            tasks = list(load_task_index(json_file, log_files).values())
+            next_id = stored_next_id(json_file, log_files)
+            source = json_file
+    except Exception as e:
+        print(f"读取任务文件失败: {e}")
+
+    if not tasks:
+        repository = BackupRepository(backup_dir)
+        for name in reversed(repository.names()):
+            try:
+                tasks = repository.restore(name)
+            except Exception as e:
+                print(f"读取备份失败: {e}")
+                continue
+            assign_task_ids(tasks)
+            source = os.path.join(backup_dir, name)
+            break
+
+    if tasks and not storage.save(tasks):
+        return 0
+    storage.reserve_ids(next_id)
+    storage.set_meta("migrated_from", source or "")
+    return len(tasks)
@@ -0,0 +1,109 @@
+﻿# stats.py
+import datetime
+from collections import Counter
+from model import NO_DUE, today_ordinal
+
+# 截止日期在今天起几天内（含今天）的未完成任务算作近期截止
+UPCOMING_DAYS = 3
+
+class StatsAggregator:
+    """
+    任务统计：总数、已完成、未完成、已过期、近期截止
+
+    接口与 indexes.py 中的索引相同（fields、build、add、remove），由 TaskStore 在每次修改时维护，
+    每次增删改只调整几个计数器，读取统计不需要扫描任务。
+
+    另外按截止日期记录未完成任务的数量 {日期序号: 任务数}。日期变化后
+    roll_over() 根据它重新划分已过期和近期截止，代价只与不同截止日期的个数有关；
+    stats() 读取时也会检查日期，跨过午夜后第一次读取的结果总是正确的。
+    """
+
+    fields = ("completed", "due_date")
+
+    def __init__(self, today=None):
+        self.today = today_ordinal() if today is None else today
+        self.build(())
+
+    def build(self, tasks):
+        """根据全部任务重新统计"""
+        self.total = 0
+        self.completed = 0
+        self.overdue = 0
+        self.upcoming = 0
+        self._active_by_due = Counter()
+        for task in tasks:
+            self.add(task)
+
+    def _bucket(self, due):
+        """未完成任务按截止日期所属的分组：overdue、upcoming 或 None"""
+        if due == NO_DUE:
+            return None
+        if due < self.today:
+            return "overdue"
+        if due - self.today <= UPCOMING_DAYS:
+            return "upcoming"
+        return None
+
+    def add(self, task):
+        self.total += 1
+        if task.completed:
+            self.completed += 1
+            return
+        if task.due == NO_DUE:
+            return
+        self._active_by_due[task.due] += 1
+        bucket = self._bucket(task.due)
+        if bucket == "overdue":
+            self.overdue += 1
+        elif bucket == "upcoming":
+            self.upcoming += 1
+
+    def remove(self, task):
+        self.total -= 1
+        if task.completed:
+            self.completed -= 1
+            return
+        if task.due == NO_DUE:
+            return
+        self._active_by_due[task.due] -= 1
+        if not self._active_by_due[task.due]:
+            del self._active_by_due[task.due]
+        bucket = self._bucket(task.due)
+        if bucket == "overdue":
+            self.overdue -= 1
+        elif bucket == "upcoming":
+            self.upcoming -= 1
+
+    def roll_over(self, today=None):
+        """日期变为 today（默认今天）时重新划分已过期和近期截止的任务，返回日期是否变化"""
+        today = today_ordinal() if today is None else today
+        if today == self.today:
+            return False
+        self.today = today
+        self.overdue = 0
+        self.upcoming = 0
+        for due, count in self._active_by_due.items():
+            bucket = self._bucket(due)
+            if bucket == "overdue":
+                self.overdue += count
+            elif bucket == "upcoming":
+                self.upcoming += count
+        return True
+
+    def stats(self):
+        """返回统计结果（字段与 data.get_task_stats 相同）"""
+        self.roll_over()
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "active": self.total - self.completed,
+            "overdue": self.overdue,
+            "upcoming": self.upcoming,
+            "completion_rate": (self.completed / self.total * 100) if self.total > 0 else 0
+        }
+
+def seconds_until_tomorrow():
+    """距离下一个午夜的秒数"""
+    now = datetime.datetime.now()
+    tomorrow = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+    return (tomorrow - now).total_seconds()
@@ -0,0 +1,349 @@
+﻿# store.py
+import threading
+from itertools import islice
+from operator import attrgetter
+from data import JsonStorage, add_record, update_record, delete_record, coalesce_records, assign_task_ids
+from workers import SaveWorker
+from model import Task, NO_DUE
+from indexes import ValueIndex, DueDateIndex, TextIndex
+from sorting import SortedView, SortSpec, SORT_TYPES
+from stats import StatsAggregator
+from perf import timed, timer
+
+# 一次添加的任务数达到该值时，有序的索引和视图改为在下一次使用时重新建立
+BULK_ADD_THRESHOLD = 256
+
+class TaskStore:
+    """
+    任务存储：按 id 索引的任务集合
+
+    任务按添加顺序保存在 {id: 任务} 字典中，查找、修改、删除都是 O(1)。
+    每次修改生成一条日志记录交给后台保存线程，由它合并后批量写入存储
+    （JsonStorage 或 SqliteStorage），主线程不等待磁盘 I/O。
+
+    另外维护几个二级索引（完成状态、优先级、截止日期、文本倒排索引），
+    在每次修改时同步更新，过滤和关键词查询只需遍历最小的候选集合，不必扫描全部任务。
+
+    修改和查询由一把锁保护，查询可以放在后台线程中执行。
+
+    lazy=True 时创建后不读取任务，由调用者反复调用 load_more() 分批读取；
+    读取完成前的修改会先读完剩余的任务（需要知道全部 id 才能分配新 id）。
+    """
+
+    def __init__(self, filename="tasks.json", storage=None, lazy=False):
+        self.storage = storage if storage is not None else JsonStorage(filename)
+        self._tasks = {}
+        self._next_id = 1
+        self._lock = threading.RLock()
+        self.version = 0  # 每次修改加一，用于判断数据是否变化
+        self.writer = SaveWorker(self.storage, coalesce_records)
+
+        # 二级索引
+        self.by_completed = ValueIndex("completed")
+        self.by_priority = ValueIndex("priority")
+        self.by_due = DueDateIndex()  # 全部任务读取完成后建立
+        self.by_text = TextIndex()  # 第一次关键词查询时才建立
+        self.counters = StatsAggregator()  # 统计计数，与索引一起维护
+        self._indexes = [self.by_completed, self.by_priority, self.by_due, self.by_text, self.counters]
+        self.sorted_views = {}  # (排序方式, 是否倒序) 或 SortSpec → SortedView，第一次按该方式排序时建立
+
+        # 一次读取全部任务时用 load()，整个文件一起解析更快
+        self._loader = self.storage.iter_load() if lazy else iter(self.storage.load())
+        if not lazy:
+            self.load_all()
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __iter__(self):
+        return iter(self._tasks.values())
+
+    def __contains__(self, task_id):
+        return task_id in self._tasks
+
+    def get(self, task_id):
+        """按 id 获取任务，不存在时返回 None"""
+        return self._tasks.get(task_id)
+
+    @property
+    def loading(self):
+        """是否还有任务没有读取"""
+        return self._loader is not None
+
+    @property
+    def load_progress(self):
+        """已读取的比例（0~1）"""
+        return getattr(self.storage, "load_progress", 1.0) if self.loading else 1.0
+
+    @timed("store.load_batch")
+    def load_more(self, count=1000):
+        """继续读取最多 count 个任务，返回本次读取的任务列表"""
+        with self._lock:
+            if self._loader is None:
+                return []
+            try:
+                batch = list(islice(self._loader, count))
+            except Exception as e:
+                print(f"加载任务失败: {e}")
+                batch = []
+                count = 1  # 出错时结束读取，保留已读取的任务
+
+            for task in batch:
+                self._tasks[task.id] = task
+                for index in self._indexes:
+                    index.add(task)
+
+            if len(batch) < count:
+                self._loader = None
+                # 存储记录的下一个 id 包括已删除的任务，删除 id 最大的任务后重启也不会重复使用它的 id
+                self._next_id = max(max(self._tasks, default=0) + 1, getattr(self.storage, "next_id", 1))
+                self.by_due.build(self._tasks.values())
+            return batch
+
+    def load_all(self):
+        """读取剩余的全部任务"""
+        while self.loading:
+            self.load_more(10000)
+
+    @timed("store.add")
+    def add(self, task):
+        """添加任务并分配 id，返回该任务（JSON 格式的字典会转换为 Task）"""
+        if not isinstance(task, Task):
+            task = Task.from_dict(task)
+        self.load_all()
+        with self._lock:
+            task.id = self._next_id
+            self._next_id += 1
+            self._tasks[task.id] = task
+            for index in self._indexes:
+                index.add(task)
+            self.version += 1
+            self.writer.submit(add_record(task))
+        return task
+
+    @timed("store.add_many")
+    def add_many(self, tasks):
+        """
+        批量添加任务（Task 或 JSON 格式的字典），返回添加的任务列表
+
+        整批只取一次锁、版本号只加一。任务较多时不逐个二分插入截止日期索引和有序视图，
+        而是让它们失效：截止日期索引在下一次按日期查询时重新建立，有序视图在下一次按该方式排序时重新建立，
+        一次排序比逐个插入快得多，连续导入多批时也只在查询时建立一次。
+        """
+        tasks = [task if isinstance(task, Task) else Task.from_dict(task) for task in tasks]
+        if not tasks:
+            return tasks
+        self.load_all()
+        with self._lock:
+            indexes = self._indexes
+            if len(tasks) >= BULK_ADD_THRESHOLD:
+                self.by_due.built = False
+                for view in self.sorted_views.values():
+                    self._indexes.remove(view)
+                self.sorted_views = {}
+                indexes = [index for index in self._indexes if index is not self.by_due]
+            for task in tasks:
+                task.id = self._next_id
+                self._next_id += 1
+                self._tasks[task.id] = task
+                for index in indexes:
+                    index.add(task)
+                self.writer.submit(add_record(task))
+            self.version += 1
+        return tasks
+
+    @timed("store.update")
+    def update(self, task_id, **fields):
+        """修改任务的部分字段，返回修改后的任务"""
+        self.load_all()
+        with self._lock:
+            task = self._tasks[task_id]
+            # 只更新依赖这些字段的索引
+            affected = [index for index in self._indexes if not fields.keys().isdisjoint(index.fields)]
+            for index in affected:
+                index.remove(task)
+            task.update(**fields)
+            for index in affected:
+                index.add(task)
+            self.version += 1
+            self.writer.submit(update_record(task_id, fields))
+        return task
+
+    @timed("store.remove")
+    def remove(self, task_id):
+        """删除任务，返回被删除的任务"""
+        self.load_all()
+        with self._lock:
+            task = self._tasks.pop(task_id)
+            for index in self._indexes:
+                index.remove(task)
+            self.version += 1
+            self.writer.submit(delete_record(task_id))
+        return task
+
+    def sorted_view(self, sort_type, reverse=False):
+        """返回按 sort_type（排序方式名称或 SortSpec）排序的 SortedView（之后随每次修改自动维护）"""
+        order = sort_type if isinstance(sort_type, SortSpec) else (sort_type, reverse)
+        with self._lock:
+            view = self.sorted_views.get(order)
+            if view is None:
+                if isinstance(sort_type, SortSpec):
+                    view = SortedView(sort_type.key, sort_type.fields, sort_type.decorate)
+                else:
+                    key_factory, fields = SORT_TYPES[sort_type]
+                    view = SortedView(key_factory(reverse), fields)
+                with timer("sort.build_view"):
+                    view.build(self._tasks.values())
+                self.sorted_views[order] = view
+                self._indexes.append(view)
+            return view
+
+    @timed("store.query")
+    def query(self, completed=None, priority=None, date_range=None, keyword=None, case_sensitive=False,
+              order=None, cancelled=None):
+        """
+        按条件查询任务，返回按添加顺序排列的任务列表
+
+        参数:
+        - completed: None=全部, True=已完成, False=未完成
+        - priority: 优先级("高", "中", "低" 或 None表示全部)
+        - date_range: 日期范围元组 (start_date, end_date) 或 None；
+          没有截止日期的任务不受日期范围限制（与 data.search_tasks 一致）
+        - keyword: 任务文本需包含的关键词，None 或空字符串表示不限
+        - case_sensitive: 关键词是否区分大小写
+        - order: 排序方式 (sort_type, reverse) 或 SortSpec，None、sort_type 为 "none" 或空的 SortSpec 时按添加顺序
+        - cancelled: 可选的无参函数（如 QueryWorker.stale），遍历候选任务时定期调用，
+          返回 True 时停止查询并返回 None，不必等查询执行完才释放锁
+
+        从满足单个条件的候选集合中选出最小的一个遍历，其余条件直接检查任务字段，
+        代价与最小候选集合的大小成正比。排序使用维护好的 SortedView，不重新排序全部任务。
+        """
+        with self._lock:
+            if isinstance(order, SortSpec):
+                view = self.sorted_view(order) if order else None
+            else:
+                view = self.sorted_view(*order) if order is not None and order[0] != "none" else None
+            if view is None:
+                return self._query(completed, priority, date_range, keyword, case_sensitive, cancelled)
+
+            if completed is None and not priority and not date_range and not keyword:
+                return view.tasks()
+            results = self._query(completed, priority, date_range, keyword, case_sensitive, cancelled)
+            if results is None:
+                return None
+            if len(results) * 8 < len(view):
+                # 结果较少时直接用缓存的排序键排序
+                results.sort(key=view.key_of)
+                return results
+            # 结果较多时按视图的顺序挑出
+            ids = {task.id for task in results}
+            return [task for task in view if task.id in ids]
+
+    def _query(self, completed, priority, date_range, keyword, case_sensitive, cancelled=None):
+        start = end = None
+        if date_range:
+            start_date, end_date = date_range
+            start = start_date.toordinal() if start_date else None
+            end = end_date.toordinal() if end_date else None
+
+        # (候选数量, 取出候选 id 的函数)
+        candidates = []
+        if completed is not None:
+            ids = self.by_completed.ids(completed)
+            candidates.append((len(ids), lambda: ids))
+        if priority:
+            priority_ids = self.by_priority.ids(priority)
+            candidates.append((len(priority_ids), lambda: priority_ids))
+        if date_range and not self.by_due.built and self._loader is None:
+            # 批量添加后失效的截止日期索引在这里重新建立
+            self.by_due.build(self._tasks.values())
+        if date_range and self.by_due.built:
+            count = self.by_due.count(start, end) + len(self.by_due.no_due)
+            candidates.append((count, lambda: self.by_due.ids(start, end) + list(self.by_due.no_due)))
+        if keyword:
+            if not self.by_text.built:
+                self.by_text.build(self._tasks.values())
+            candidates.append(self.by_text.candidates(keyword))
+            lowered = keyword.lower()
+
+        if not candidates:
+            if not date_range:
+                return list(self._tasks.values())
+            candidates.append((len(self._tasks), lambda: list(self._tasks)))
+
+        _, source = min(candidates, key=lambda candidate: candidate[0])
+        tasks = self._tasks
+        results = []
+        for position, task_id in enumerate(source()):
+            if cancelled is not None and not position & 1023 and cancelled():
+                return None
+            task = tasks[task_id]
+            if completed is not None and task.completed != completed:
+                continue
+            if priority and task.priority != priority:
+                continue
+            if date_range and task.due != NO_DUE:
+                if (start is not None and task.due < start) or (end is not None and task.due > end):
+                    continue
+            if keyword:
+                if case_sensitive:
+                    if keyword not in task.text:
+                        continue
+                elif lowered not in task.text.lower():
+                    continue
+            results.append(task)
+
+        # id 按添加顺序递增
+        results.sort(key=attrgetter("id"))
+        return results
+
+    @timed("store.replace")
+    def replace(self, tasks):
+        """用 tasks 替换全部任务（例如恢复备份），并立即完整保存，返回是否保存成功"""
+        tasks = list(tasks)
+        self.load_all()
+        with self._lock:
+            # 缺少 id 的任务从未使用过的 id 开始分配
+            self._next_id = assign_task_ids(tasks, self._next_id)
+            # 先写完之前的修改，之后的完整保存会覆盖它们
+            self.writer.flush()
+            self._tasks = {task.id: task for task in tasks}
+            for index in self._indexes:
+                if index is not self.by_text or self.by_text.built:
+                    index.build(self._tasks.values())
+            self.version += 1
+            return self.storage.save(list(self._tasks.values()))
+
+    def stats(self):
+        """返回任务统计（总数、已完成、未完成、已过期、近期截止、完成率），不扫描任务"""
+        with self._lock:
+            return self.counters.stats()
+
+    def iter_snapshot(self, batch_size=5000):
+        """
+        逐批返回全部任务的副本（按添加顺序），可以在其他线程中使用
+
+        任务列表在开始时确定；每批在锁内复制，同一个任务不会一部分字段是修改前的、
+        一部分是修改后的。批与批之间释放锁，复制大量任务时不会长时间阻塞界面上的修改。
+        """
+        with self._lock:
+            tasks = list(self._tasks.values())
+        for start in range(0, len(tasks), batch_size):
+            with self._lock:
+                batch = [task.copy() for task in tasks[start:start + batch_size]]
+            yield batch
+
+    def snapshot(self):
+        """返回全部任务的副本，可以交给其他线程使用"""
+        with self._lock:
+            return [Task.from_dict(task.to_dict()) for task in self._tasks.values()]
+
+    def flush(self):
+        """等待所有修改写入磁盘"""
+        self.writer.flush()
+
+    def close(self):
+        """关闭存储，等待修改写完"""
+        self._loader = None
+        self.writer.close()
+        self.storage.close()
@@ -0,0 +1,78 @@
+﻿# theme.py
+import tkinter as tk
+
+# 主题调色板
+THEMES = {
+    "light": {
+        "bg": "#f0f0f0",
+        "fg": "#000000",
+        "button_bg": "#e0e0e0",
+        "highlight_bg": "#4CAF50",
+        "listbox_bg": "#ffffff",
+        "completed_fg": "#a0a0a0"
+    },
+    "dark": {
+        "bg": "#2c2c2c",
+        "fg": "#ffffff",
+        "button_bg": "#3c3c3c",
+        "highlight_bg": "#388E3C",
+        "listbox_bg": "#383838",
+        "completed_fg": "#808080"
+    }
+}
+
+# 常用的控件配色方式：{控件选项: 调色板中的颜色名}
+FRAME = {"bg": "bg"}
+LABEL = {"bg": "bg", "fg": "fg"}
+OPTION = {"bg": "bg", "fg": "fg", "selectcolor": "button_bg"}  # 单选框、复选框
+BUTTON = {"bg": "button_bg", "fg": "fg"}
+LISTBOX = {"bg": "listbox_bg", "fg": "fg"}
+
+class ThemeEngine:
+    """
+    主题引擎
+
+    控件在创建时用 register() 登记一次配色方式，切换主题时 apply() 遍历一遍
+    登记的控件，每个控件只调用一次 configure；已销毁的控件在遍历时自动移除。
+    需要额外处理的部分（如任务列表中已完成任务的颜色）通过 on_change() 订阅。
+    """
+
+    def __init__(self, current="light", themes=THEMES):
+        self.themes = themes
+        self.current = current if current in themes else "light"
+        self._widgets = []  # (控件, 配色方式)
+        self._listeners = []
+
+    @property
+    def palette(self):
+        """当前主题的调色板"""
+        return self.themes[self.current]
+
+    def register(self, roles, *widgets):
+        """按配色方式 roles 登记控件，并立即应用当前主题"""
+        palette = self.palette
+        for widget in widgets:
+            self._widgets.append((widget, roles))
+            widget.configure(**{option: palette[color] for option, color in roles.items()})
+
+    def on_change(self, callback):
+        """切换主题后调用 callback(调色板)"""
+        self._listeners.append(callback)
+
+    def apply(self, name=None):
+        """切换到主题 name（None 表示重新应用当前主题）"""
+        if name is not None:
+            self.current = name
+        palette = self.palette
+
+        alive = []
+        for widget, roles in self._widgets:
+            try:
+                widget.configure(**{option: palette[color] for option, color in roles.items()})
+            except tk.TclError:
+                continue  # 控件已销毁
+            alive.append((widget, roles))
+        self._widgets = alive
+
+        for callback in self._listeners:
+            callback(palette)
@@ -3,34 +3,27 @@ import tkinter as tk
 from tkinter import messagebox, ttk, filedialog
 from tkcalendar import DateEntry  # 需要安装: pip install tkcalendar
 import datetime
-from functions import add_task, delete_task, modify_task
-from data import save_tasks, load_tasks, export_tasks_as_text, backup_tasks
+import perf
+from engine import TaskEngine
+from widgets import VirtualListbox
+from model import NO_DUE, today_ordinal
+from workers import QueryWorker
+from config import get_config
+from theme import ThemeEngine, FRAME, LABEL, OPTION, BUTTON, LISTBOX
+from sorting import SortSpec, SORT_FIELDS
+from stats import seconds_until_tomorrow
 
 class ToDoAppUI:
     def __init__(self, root):
         self.root = root
         self.root.title("ToDo任务列表应用")
         
-        # 主题设置
-        self.theme_color = {
-            "light": {
-                "bg": "#f0f0f0",
-                "fg": "#000000",
-                "button_bg": "#e0e0e0",
-                "highlight_bg": "#4CAF50",
-                "listbox_bg": "#ffffff",
-                "completed_fg": "#a0a0a0"
-            },
-            "dark": {
-                "bg": "#2c2c2c",
-                "fg": "#ffffff",
-                "button_bg": "#3c3c3c",
-                "highlight_bg": "#388E3C",
-                "listbox_bg": "#383838",
-                "completed_fg": "#808080"
-            }
-        }
-        self.current_theme = "light"
+        # 配置只读取一次，修改后通知订阅者并在后台批量写回
+        self.settings = get_config()
+        
+        # 主题设置：控件创建后登记到主题引擎，切换主题时统一重新着色
+        self.theme = ThemeEngine(self.settings["theme"])
+        self.current_theme = self.theme.current
         
         # 创建菜单栏
         self.menu_bar = tk.Menu(root)
@@ -39,8 +32,11 @@ class ToDoAppUI:
         # 文件菜单
         self.file_menu = tk.Menu(self.menu_bar, tearoff=0)
         self.menu_bar.add_cascade(label="文件", menu=self.file_menu)
-        self.file_menu.add_command(label="导出为文本", command=self.export_as_text)
+        self.file_menu.add_command(label="导入...", command=self.import_tasks)
+        self.file_menu.add_separator()
+        self.file_menu.add_command(label="导出...", command=self.export_tasks)
         self.file_menu.add_command(label="备份数据", command=self.backup_data)
+        self.file_menu.add_command(label="恢复备份", command=self.restore_backup)
         self.file_menu.add_separator()
         self.file_menu.add_command(label="退出", command=root.quit)
         
@@ -64,6 +60,11 @@ class ToDoAppUI:
         self.sort_menu.add_command(label="按截止日期（远→近）", command=lambda: self.sort_tasks("date", True))
         self.sort_menu.add_separator()
         self.sort_menu.add_command(label="不排序（按添加顺序）", command=lambda: self.sort_tasks("none", False))
+        self.sort_menu.add_separator()
+        self.sort_menu.add_command(label="自定义排序...", command=self.open_sort_dialog)
+        
+        self.view_menu.add_separator()
+        self.view_menu.add_command(label="性能...", command=self.open_perf_panel)
         
         # 设置菜单
         self.settings_menu = tk.Menu(self.menu_bar, tearoff=0)
@@ -192,24 +193,25 @@ class ToDoAppUI:
                                           width=8)
         self.sort_date_desc_btn.pack(side=tk.LEFT, padx=2)
         
-        # 当前排序方式
-        self.current_sort = ("none", False)  # (sort_type, reverse)
+        self.sort_custom_btn = tk.Button(self.sort_frame, text="自定义...", command=self.open_sort_dialog, width=8)
+        self.sort_custom_btn.pack(side=tk.LEFT, padx=2)
+        
+        # 当前排序方式：(sort_type, reverse) 或自定义的 SortSpec
+        self.current_sort = ("none", False)
         
         # 任务列表框架
         self.list_frame = tk.Frame(self.main_frame)
         self.list_frame.pack(fill=tk.BOTH, expand=True, pady=5)
         
-        # 任务列表和滚动条
-        self.scrollbar = tk.Scrollbar(self.list_frame)
-        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        self.listbox = tk.Listbox(self.list_frame, width=50, height=10, 
-                                yscrollcommand=self.scrollbar.set,
-                                font=("微软雅黑", 10),
-                                selectbackground="#a6a6a6",
-                                activestyle="none")
-        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.scrollbar.config(command=self.listbox.yview)
+        # 任务列表（只渲染可见行的虚拟列表）和滚动条
+        self.task_list = VirtualListbox(self.list_frame, self._format_task, self._task_color,
+                                        row_key=lambda task: task.id,
+                                        width=50, height=10,
+                                        font=("微软雅黑", self.settings["font_size"]),
+                                        selectbackground="#a6a6a6",
+                                        activestyle="none")
+        self.task_list.pack(fill=tk.BOTH, expand=True)
+        self.listbox = self.task_list.listbox
         
         # 双击事件绑定
         self.listbox.bind("<Double-1>", self.on_task_double_click)
@@ -221,171 +223,180 @@ class ToDoAppUI:
         self.status_label = tk.Label(self.status_frame, text="就绪 | 总任务数: 0", anchor=tk.W)
         self.status_label.pack(fill=tk.X)
         
-        # 加载保存的任务
-        self.tasks = load_tasks()
-        self.filtered_tasks = self.tasks.copy()  # 用于过滤显示
+        # 任务数据、查询、备份都由 TaskEngine 负责，界面只负责显示和交互
+        # 启动时只读取第一屏的任务，其余的进入主循环后分批读取
+        self.engine = TaskEngine(self.settings, lazy=True)
+        self.filtered_tasks = self.engine.load_more(200)  # 用于过滤显示
         self.reload_tasks()
-        
-        # 应用主题
+        self.root.after(1, self._load_more_tasks)
+        self._schedule_day_rollover()
+        
+        # 手动备份交给后台线程
+        self.backup_worker = QueryWorker(self.root)
+        self.import_job = None  # 正在进行的导入
+        self.export_job = None  # 正在进行的导出
+        
+        # 登记需要随主题变色的控件并应用主题
+        self.theme.register(FRAME, self.main_frame, self.input_frame, self.button_frame,
+                            self.filter_frame, self.sort_frame, self.list_frame)
+        self.theme.register(LABEL, self.title_label, self.entry_label, self.priority_label, self.date_label,
+                            self.filter_label, self.sort_label, self.status_label)
+        self.theme.register(OPTION, self.filter_all, self.filter_active, self.filter_completed, self.filter_priority)
+        self.theme.register(LISTBOX, self.listbox)
+        self.theme.register(BUTTON, self.sort_priority_asc_btn, self.sort_priority_desc_btn,
+                            self.sort_date_asc_btn, self.sort_date_desc_btn, self.sort_custom_btn)
+        self.theme.on_change(lambda palette: self.update_sort_buttons())
+        self.theme.on_change(lambda palette: self.task_list.refresh())
         self.apply_theme()
         
+        # 配置项变化时更新界面
+        self.settings.subscribe("theme", self._on_theme_changed)
+        self.settings.subscribe("font_size", self._on_font_size_changed)
+        self.settings.subscribe("perf_enabled", self._on_perf_enabled_changed)
+        
+        # 开启了性能统计时监测事件循环的卡顿
+        perf.watch_event_loop(self.root)
+        
         # 添加快捷键绑定
         self.root.bind("<Control-f>", lambda event: self.open_search_dialog())
     
+    def close(self):
+        """退出前调用：写完未保存的修改；开启了自动备份时在后台做最后一次备份"""
+        if self.import_job is not None:
+            self.import_job.cancel()
+            self.import_job.wait()
+        if self.export_job is not None:
+            self.export_job.cancel()
+            self.export_job.wait()
+        self.backup_worker.close()
+        self.engine.close()
+        self.settings.close()
+    
+    def _load_more_tasks(self):
+        """读取下一批任务，每批之后回到主循环，加载期间界面保持响应"""
+        batch = self.engine.load_more(2000)
+        show_all = self.filter_var.get() == "全部" and self.current_sort == ("none", False)
+        if show_all and batch:
+            self.filtered_tasks.extend(batch)
+            self.task_list.refresh()
+        
+        if self.engine.loading:
+            self.status_label.config(text=f"正在加载任务... {self.engine.load_progress:.0%} | 已加载: {len(self.engine)}")
+            self.root.after(1, self._load_more_tasks)
+        elif show_all and len(self.filtered_tasks) == len(self.engine):
+            self._update_status()
+        else:
+            # 按当前的过滤和排序方式显示全部任务
+            self.apply_filter()
+    
     def reload_tasks(self):
         """重新加载任务列表到UI"""
-        self.listbox.delete(0, tk.END)
-        for task in self.filtered_tasks:
-            self._display_task(task)
+        self.task_list.set_items(self.filtered_tasks)
         self._update_status()
     
-    def _display_task(self, task):
-        """将任务显示在列表中，带有优先级和完成状态标记"""
-        priority = task.get("priority", "中")
-        completed = task.get("completed", False)
-        text = task.get("text", "")
-        due_date = task.get("due_date", "")
+    def _format_task(self, task):
+        """生成任务的显示文本，带有优先级和完成状态标记"""
+        display_text = f"[{task.priority}] {task.text}"
+        if task.due_date:
+            display_text += f" (截止: {task.due_date})"
         
-        display_text = f"[{priority}] {text}"
-        if due_date:
-            display_text += f" (截止: {due_date})"
-        
-        if completed:
+        if task.completed:
             display_text = f"✓ {display_text}"
-        
-        self.listbox.insert(tk.END, display_text)
-        
-        # 如果完成则设置样式
-        if completed:
-            idx = self.listbox.size() - 1
-            self.listbox.itemconfig(idx, fg=self.theme_color[self.current_theme]["completed_fg"])
-        
-        # 如果已过期且未完成，标红显示
-        if due_date and not completed:
-            try:
-                due_date_obj = datetime.datetime.strptime(due_date, "%Y-%m-%d").date()
-                today = datetime.date.today()
-                if due_date_obj < today:
-                    idx = self.listbox.size() - 1
-                    self.listbox.itemconfig(idx, fg="red")
-            except:
-                pass
+        return display_text
+    
+    def _task_color(self, task):
+        """返回任务行的前景色：已完成为灰色，已过期且未完成为红色"""
+        if task.completed:
+            return self.theme.palette["completed_fg"]
+        
+        if task.due != NO_DUE and task.due < today_ordinal():
+            return "red"
+        return None
+    
+    def _schedule_day_rollover(self):
+        """在下一个午夜之后刷新：过期、近期截止的统计和任务颜色都随日期变化"""
+        delay_ms = int(seconds_until_tomorrow() * 1000) + 1000
+        self.root.after(delay_ms, self._on_day_rollover)
+    
+    def _on_day_rollover(self):
+        self.task_list.refresh()
+        self._update_status()
+        self._schedule_day_rollover()
     
     def _update_status(self):
-        """更新状态栏信息"""
-        total = len(self.tasks)
+        """更新状态栏信息（统计数字由 TaskStore 维护的计数器提供，不扫描任务）"""
+        stats = self.engine.stats()
         displayed = len(self.filtered_tasks)
-        completed = sum(1 for task in self.tasks if task.get("completed", False))
         
-        status_text = f"就绪 | 总任务数: {total} | 显示中: {displayed} | 已完成: {completed}"
+        status_text = f"就绪 | 总任务数: {stats['total']} | 显示中: {displayed} | 已完成: {stats['completed']}"
         
-        # 如果有即将到期的任务，提醒用户
-        today = datetime.date.today()
-        upcoming = sum(1 for task in self.tasks 
-                      if not task.get("completed", False) 
-                      and task.get("due_date") 
-                      and (today <= datetime.datetime.strptime(task.get("due_date"), "%Y-%m-%d").date() <= today + datetime.timedelta(days=3)))
+        # 如果有已过期或即将到期的任务，提醒用户
+        if stats["overdue"] > 0:
+            status_text += f" | 已过期: {stats['overdue']}"
+        if stats["upcoming"] > 0:
+            status_text += f" | 近期截止: {stats['upcoming']}"
         
-        if upcoming > 0:
-            status_text += f" | 近期截止: {upcoming}"
+        # 磁盘写入跟不上修改速度时提示
+        writer_stats = self.engine.writer_stats()
+        if writer_stats["last_latency_ms"] >= 100 or writer_stats["queue_depth"] >= 100:
+            status_text += (f" | 待写入: {writer_stats['queue_depth']}"
+                            f" | 写入耗时: {writer_stats['last_latency_ms']:.0f}ms")
             
         self.status_label.config(text=status_text)
     
+    def _selected_due_date(self):
+        """日期选择框中的截止日期，选的是今天时表示没有截止日期"""
+        return self.date_picker.get() if self.date_picker.get_date() != datetime.date.today() else ""
+    
     def on_add_task(self):
-        task = self.entry.get().strip()
-        if task:
-            priority = self.priority_var.get()
-            due_date = self.date_picker.get() if self.date_picker.get_date() != datetime.date.today() else ""
-            
-            task_data = {
-                "text": task,
-                "priority": priority,
-                "completed": False,
-                "due_date": due_date
-            }
-            
-            # 添加到数据
-            self.tasks.append(task_data)
-            save_tasks(self.tasks)
-            
-            # 应用过滤并更新界面
-            self.apply_filter()
-            self.entry.delete(0, tk.END)
-        else:
+        try:
+            self.engine.add_task(self.entry.get(), self.priority_var.get(), self._selected_due_date())
+        except ValueError:
             tk.messagebox.showwarning("警告", "任务不能为空！")
+            return
+        
+        # 应用过滤并更新界面
+        self.apply_filter()
+        self.entry.delete(0, tk.END)
     
     def on_delete_task(self):
         try:
-            selected_task_index = self.listbox.curselection()[0]
-            # 获取在过滤列表中的索引，转换为在完整任务列表中的索引
+            selected_task_index = self.task_list.curselection()[0]
+            # 通过任务 id 从存储中删除，同时从过滤列表中按位置删除
             task_to_delete = self.filtered_tasks[selected_task_index]
-            original_index = self.tasks.index(task_to_delete)
+            self.engine.remove_task(task_to_delete.id)
+            del self.filtered_tasks[selected_task_index]
             
-            # 从两个列表中都删除
-            del self.tasks[original_index]
-            self.filtered_tasks.remove(task_to_delete)
-            
-            self.listbox.delete(selected_task_index)
-            save_tasks(self.tasks)
+            self.task_list.refresh()
             self._update_status()
         except IndexError:
             tk.messagebox.showwarning("警告", "请选择一个任务进行删除！")
     
     def on_modify_task(self):
         try:
-            selected_task_index = self.listbox.curselection()[0]
-            new_task = self.entry.get().strip()
-            if new_task:
-                # 获取在完整任务列表中的索引
-                task_to_modify = self.filtered_tasks[selected_task_index]
-                original_index = self.tasks.index(task_to_modify)
-                
-                # 保持原有的完成状态
-                completed = self.tasks[original_index].get("completed", False)
-                priority = self.priority_var.get()
-                due_date = self.date_picker.get() if self.date_picker.get_date() != datetime.date.today() else ""
-                
-                # 更新任务
-                self.tasks[original_index] = {
-                    "text": new_task,
-                    "priority": priority,
-                    "completed": completed,
-                    "due_date": due_date
-                }
-                
-                # 如果任务仍然符合过滤条件，则更新显示
-                self.filtered_tasks[selected_task_index] = self.tasks[original_index]
-                self.listbox.delete(selected_task_index)
-                self._display_task(self.tasks[original_index])
-                
-                save_tasks(self.tasks)
-                self.entry.delete(0, tk.END)
-                # 重新应用过滤
-                self.apply_filter()
-            else:
+            selected_task_index = self.task_list.curselection()[0]
+            task_to_modify = self.filtered_tasks[selected_task_index]
+            try:
+                # 更新任务（保持原有的完成状态）
+                self.engine.update_task(task_to_modify.id, text=self.entry.get(),
+                                        priority=self.priority_var.get(), due_date=self._selected_due_date())
+            except ValueError:
                 tk.messagebox.showwarning("警告", "新任务不能为空！")
+                return
+            
+            self.entry.delete(0, tk.END)
+            # 重新应用过滤
+            self.apply_filter()
         except IndexError:
             tk.messagebox.showwarning("警告", "请选择一个任务进行修改！")
     
     def on_complete_task(self):
         try:
-            selected_task_index = self.listbox.curselection()[0]
-            
-            # 获取在完整任务列表中的索引
-            task_to_complete = self.filtered_tasks[selected_task_index]
-            original_index = self.tasks.index(task_to_complete)
+            selected_task_index = self.task_list.curselection()[0]
             
             # 切换完成状态
-            self.tasks[original_index]["completed"] = not self.tasks[original_index].get("completed", False)
-            
-            # 更新过滤任务列表
-            self.filtered_tasks[selected_task_index] = self.tasks[original_index]
-            
-            # 更新显示
-            self.listbox.delete(selected_task_index)
-            self._display_task(self.tasks[original_index])
-            
-            save_tasks(self.tasks)
+            task_to_complete = self.filtered_tasks[selected_task_index]
+            self.engine.toggle_completed(task_to_complete.id)
             
             # 重新应用过滤
             self.apply_filter()
@@ -395,43 +406,27 @@ class ToDoAppUI:
     def on_task_double_click(self, event):
         """双击任务时的操作，显示任务详情或直接编辑"""
         try:
-            selected_index = self.listbox.curselection()[0]
+            selected_index = self.task_list.curselection()[0]
             task = self.filtered_tasks[selected_index]
             
             # 将任务信息填充到编辑区域
             self.entry.delete(0, tk.END)
-            self.entry.insert(0, task["text"])
-            self.priority_var.set(task["priority"])
+            self.entry.insert(0, task.text)
+            self.priority_var.set(task.priority)
             
-            if task.get("due_date"):
-                try:
-                    due_date = datetime.datetime.strptime(task["due_date"], "%Y-%m-%d").date()
-                    self.date_picker.set_date(due_date)
-                except:
-                    pass
+            if task.due != NO_DUE:
+                self.date_picker.set_date(datetime.date.fromordinal(task.due))
             else:
                 self.date_picker.set_date(datetime.date.today())
                 
         except IndexError:
             pass
     
+    @perf.timed("ui.apply_filter")
     def apply_filter(self):
-        """应用过滤条件"""
-        filter_type = self.filter_var.get()
-        
-        if filter_type == "全部":
-            self.filtered_tasks = self.tasks.copy()
-        elif filter_type == "未完成":
-            self.filtered_tasks = [task for task in self.tasks if not task.get("completed", False)]
-        elif filter_type == "已完成":
-            self.filtered_tasks = [task for task in self.tasks if task.get("completed", False)]
-        elif filter_type == "优先级":
-            priority = self.priority_filter_var.get()
-            self.filtered_tasks = [task for task in self.tasks if task.get("priority") == priority]
-        
-        # 应用当前排序方式
-        self.sort_tasks(self.current_sort[0], self.current_sort[1], refresh_ui=False)
-        
+        """应用过滤条件和当前排序方式"""
+        self.filtered_tasks = self.engine.filter_tasks(self.filter_var.get(), self.priority_filter_var.get(),
+                                                       self.current_sort)
         self.reload_tasks()
     
     def sort_tasks(self, sort_type, reverse=False, refresh_ui=True):
@@ -439,54 +434,23 @@ class ToDoAppUI:
         排序任务列表
         
         参数:
-        - sort_type: 排序类型 ("priority", "date", "none")
-        - reverse: 是否倒序
+        - sort_type: 排序类型 ("priority", "date", "none")，或自定义排序 SortSpec
+        - reverse: 是否倒序（SortSpec 不使用）
         - refresh_ui: 是否刷新界面
-        """
-        self.current_sort = (sort_type, reverse)
         
-        if sort_type == "none":
-            # 不做任何排序，保持原有顺序
-            pass
-        elif sort_type == "priority":
-            # 优先级映射为数值，便于排序
-            priority_map = {"高": 0, "中": 1, "低": 2}
-            
-            # 先按完成状态分组，未完成的在前，已完成的在后
-            # 然后在每组内部按优先级排序
-            self.filtered_tasks.sort(
-                key=lambda t: (
-                    t.get("completed", False),  # 完成状态（False排在前面）
-                    priority_map.get(t.get("priority", "中"), 1)  # 优先级
-                ),
-                reverse=reverse
-            )
-        elif sort_type == "date":
-            today = datetime.date.today()
-            
-            def get_date_value(task):
-                # 完成的任务放在最后
-                if task.get("completed", False):
-                    return datetime.date.max
-                
-                # 没有截止日期的任务根据reverse决定位置
-                if not task.get("due_date"):
-                    return datetime.date.min if reverse else datetime.date.max
-                
-                # 有截止日期的按日期排序
-                try:
-                    return datetime.datetime.strptime(task.get("due_date"), "%Y-%m-%d").date()
-                except:
-                    return today
-            
-            self.filtered_tasks.sort(key=get_date_value, reverse=reverse)
+        排序由 TaskStore 维护的有序视图完成（见 sorting.py），切换排序方式不需要重新排序全部任务。
+        """
+        if isinstance(sort_type, SortSpec):
+            self.current_sort = sort_type if sort_type else ("none", False)
+        else:
+            self.current_sort = (sort_type, reverse)
         
         # 更新排序按钮样式
         self.update_sort_buttons()
         
         # 刷新界面
         if refresh_ui:
-            self.reload_tasks()
+            self.apply_filter()
     
     def update_sort_buttons(self):
         """更新排序按钮的样式，突出显示当前排序方式"""
@@ -495,14 +459,18 @@ class ToDoAppUI:
             self.sort_priority_asc_btn, 
             self.sort_priority_desc_btn,
             self.sort_date_asc_btn,
-            self.sort_date_desc_btn
+            self.sort_date_desc_btn,
+            self.sort_custom_btn
         ]
         
-        theme = self.theme_color[self.current_theme]
+        theme = self.theme.palette
         for btn in buttons:
             btn.config(relief=tk.RAISED, bg=theme["button_bg"])
         
         # 设置当前排序按钮样式
+        if isinstance(self.current_sort, SortSpec):
+            self.sort_custom_btn.config(relief=tk.SUNKEN, bg=theme["highlight_bg"])
+            return
         sort_type, reverse = self.current_sort
         if sort_type == "priority":
             btn = self.sort_priority_desc_btn if reverse else self.sort_priority_asc_btn
@@ -511,83 +479,327 @@ class ToDoAppUI:
             btn = self.sort_date_desc_btn if reverse else self.sort_date_asc_btn
             btn.config(relief=tk.SUNKEN, bg=theme["highlight_bg"])
     
+    def open_sort_dialog(self):
+        """打开自定义排序对话框：依次选择若干排序字段及方向"""
+        sort_window = tk.Toplevel(self.root)
+        sort_window.title("自定义排序")
+        sort_window.resizable(False, False)
+        sort_window.transient(self.root)
+        sort_window.grab_set()
+        
+        sort_frame = tk.Frame(sort_window, padx=20, pady=15)
+        sort_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # 每行一个排序字段，前面的字段优先；"（无）" 表示不使用该行
+        field_names = ["（无）"] + [name for name, *_ in SORT_FIELDS.values()]
+        fields_by_name = {SORT_FIELDS[field][0]: field for field in SORT_FIELDS}
+        current = self.current_sort.keys if isinstance(self.current_sort, SortSpec) else ()
+        
+        rows = []
+        for row in range(len(SORT_FIELDS)):
+            label = tk.Label(sort_frame, text="排序依据:" if row == 0 else "然后按:", anchor="w")
+            label.grid(row=row, column=0, sticky="w", pady=2)
+            field, descending = current[row] if row < len(current) else (None, False)
+            field_var = tk.StringVar(value=SORT_FIELDS[field][0] if field else "（无）")
+            field_box = ttk.Combobox(sort_frame, textvariable=field_var, values=field_names,
+                                     width=10, state="readonly")
+            field_box.grid(row=row, column=1, padx=5, pady=2)
+            direction_var = tk.StringVar(value="降序" if descending else "升序")
+            direction_box = ttk.Combobox(sort_frame, textvariable=direction_var, values=["升序", "降序"],
+                                         width=5, state="readonly")
+            direction_box.grid(row=row, column=2, pady=2)
+            self.theme.register(LABEL, label)
+            rows.append((field_var, direction_var))
+        
+        def apply_sort():
+            keys = []
+            for field_var, direction_var in rows:
+                field = fields_by_name.get(field_var.get())
+                # 同一字段只有第一次出现有效
+                if field and field not in (key[0] for key in keys):
+                    keys.append((field, direction_var.get() == "降序"))
+            sort_window.destroy()
+            self.sort_tasks(SortSpec(keys))
+        
+        button_frame = tk.Frame(sort_frame)
+        button_frame.grid(row=len(SORT_FIELDS), column=0, columnspan=3, pady=(10, 0))
+        ok_button = tk.Button(button_frame, text="确定", command=apply_sort, width=8)
+        ok_button.pack(side=tk.LEFT, padx=5)
+        cancel_button = tk.Button(button_frame, text="取消", command=sort_window.destroy, width=8)
+        cancel_button.pack(side=tk.LEFT, padx=5)
+        
+        self.theme.register(FRAME, sort_window, sort_frame, button_frame)
+        self.theme.register(BUTTON, ok_button, cancel_button)
+        sort_window.focus_set()
+    
+    def _on_perf_enabled_changed(self, value):
+        if value:
+            perf.enable()
+            perf.watch_event_loop(self.root)
+        else:
+            perf.disable()
+    
+    def open_perf_panel(self):
+        """打开性能面板：各操作耗时的 p50/p99、事件循环卡顿、后台写入统计，以及性能分析的开始和保存"""
+        perf_window = tk.Toplevel(self.root)
+        perf_window.title("性能")
+        perf_window.geometry("680x420")
+        perf_window.transient(self.root)
+        
+        perf_frame = tk.Frame(perf_window, padx=10, pady=10)
+        perf_frame.pack(fill=tk.BOTH, expand=True)
+        
+        state_label = tk.Label(perf_frame, anchor="w", justify=tk.LEFT)
+        state_label.pack(fill=tk.X)
+        
+        # 计时项：每行一个操作
+        columns = ("count", "p50", "p99", "max", "total")
+        headings = ("次数", "p50 (ms)", "p99 (ms)", "最大 (ms)", "总计 (ms)")
+        timer_tree = ttk.Treeview(perf_frame, columns=columns, height=12)
+        timer_tree.heading("#0", text="操作")
+        timer_tree.column("#0", width=200)
+        for column, heading in zip(columns, headings):
+            timer_tree.heading(column, text=heading)
+            timer_tree.column(column, width=80, anchor=tk.E)
+        timer_tree.pack(fill=tk.BOTH, expand=True, pady=5)
+        
+        counter_label = tk.Label(perf_frame, anchor="w", justify=tk.LEFT)
+        counter_label.pack(fill=tk.X)
+        
+        button_frame = tk.Frame(perf_frame)
+        button_frame.pack(fill=tk.X, pady=(5, 0))
+        toggle_button = tk.Button(button_frame, width=10,
+                                  command=lambda: self.settings.set("perf_enabled", not perf.enabled()))
+        toggle_button.pack(side=tk.LEFT, padx=2)
+        reset_button = tk.Button(button_frame, text="清空", width=8, command=perf.reset)
+        reset_button.pack(side=tk.LEFT, padx=2)
+        
+        def toggle_profile():
+            if not perf.profiling():
+                perf.enable()
+                perf.start_profile()
+                return
+            filename = filedialog.asksaveasfilename(parent=perf_window, defaultextension=".prof",
+                                                    filetypes=[("cProfile", "*.prof")], title="保存性能分析")
+            if not filename:
+                return
+            prefix = filename[:-len(".prof")] if filename.endswith(".prof") else filename
+            try:
+                files = perf.stop_profile(prefix)
+            except Exception as e:
+                messagebox.showerror("错误", f"保存性能分析失败: {e}", parent=perf_window)
+                return
+            messagebox.showinfo("成功", "已保存:\n" + "\n".join(files), parent=perf_window)
+        
+        profile_button = tk.Button(button_frame, width=16, command=toggle_profile)
+        profile_button.pack(side=tk.LEFT, padx=2)
+        
+        def refresh():
+            if not perf_window.winfo_exists():
+                return
+            if perf.enabled():
+                state_label.config(text="性能统计已开启（p50/p99 按每项最近的样本计算）")
+                toggle_button.config(text="关闭统计")
+            else:
+                state_label.config(text="性能统计未开启：可在此开启，或设置环境变量 YATTODO_PERF=1、配置项 perf_enabled")
+                toggle_button.config(text="开启统计")
+            profile_button.config(text="停止分析并保存..." if perf.profiling() else "开始 cProfile 分析")
+            
+            timers, counters = perf.report()
+            timer_tree.delete(*timer_tree.get_children())
+            for row in timers:
+                timer_tree.insert("", tk.END, text=row["name"], values=(
+                    row["count"], f"{row['p50_ms']:.2f}", f"{row['p99_ms']:.2f}",
+                    f"{row['max_ms']:.2f}", f"{row['total_ms']:.1f}"))
+            
+            writer_stats = self.engine.writer_stats()
+            lines = [f"后台写入: {writer_stats['batches']} 次，平均 {writer_stats['avg_latency_ms']:.1f} ms，"
+                     f"最长 {writer_stats['max_latency_ms']:.1f} ms，待写入 {writer_stats['queue_depth']}"]
+            if counters:
+                lines.append("计数: " + "，".join(f"{name} {value}" for name, value in sorted(counters.items())))
+            counter_label.config(text="\n".join(lines))
+            perf_window.after(1000, refresh)
+        
+        self.theme.register(FRAME, perf_frame, button_frame)
+        self.theme.register(LABEL, state_label, counter_label)
+        self.theme.register(BUTTON, toggle_button, reset_button, profile_button)
+        refresh()
+    
     def toggle_theme(self):
         """切换明暗主题"""
-        self.current_theme = "dark" if self.current_theme == "light" else "light"
+        self.settings.set("theme", "dark" if self.current_theme == "light" else "light")
+    
+    def _on_theme_changed(self, theme):
+        self.current_theme = theme
         self.apply_theme()
     
+    def _on_font_size_changed(self, font_size):
+        self.listbox.config(font=("微软雅黑", font_size))
+        self.task_list.refresh()
+    
     def apply_theme(self):
-        """应用当前主题"""
-        theme = self.theme_color[self.current_theme]
-        
-        # 主背景色
-        self.main_frame.config(bg=theme["bg"])
-        self.input_frame.config(bg=theme["bg"])
-        self.button_frame.config(bg=theme["bg"])
-        self.filter_frame.config(bg=theme["bg"])
-        self.sort_frame.config(bg=theme["bg"])  # 添加排序框架
-        self.list_frame.config(bg=theme["bg"])
-        
-        # 标签颜色
-        self.title_label.config(bg=theme["bg"], fg=theme["fg"])
-        self.entry_label.config(bg=theme["bg"], fg=theme["fg"])
-        self.priority_label.config(bg=theme["bg"], fg=theme["fg"])
-        self.date_label.config(bg=theme["bg"], fg=theme["fg"])
-        self.filter_label.config(bg=theme["bg"], fg=theme["fg"])
-        self.sort_label.config(bg=theme["bg"], fg=theme["fg"])  # 添加排序标签
-        self.status_label.config(bg=theme["bg"], fg=theme["fg"])
-        
-        # 单选按钮
-        self.filter_all.config(bg=theme["bg"], fg=theme["fg"], selectcolor=theme["button_bg"])
-        self.filter_active.config(bg=theme["bg"], fg=theme["fg"], selectcolor=theme["button_bg"])
-        self.filter_completed.config(bg=theme["bg"], fg=theme["fg"], selectcolor=theme["button_bg"])
-        self.filter_priority.config(bg=theme["bg"], fg=theme["fg"], selectcolor=theme["button_bg"])
-        
-        # 列表框
-        self.listbox.config(bg=theme["listbox_bg"], fg=theme["fg"])
-        
-        # 排序按钮
-        self.sort_priority_asc_btn.config(bg=theme["button_bg"], fg=theme["fg"])
-        self.sort_priority_desc_btn.config(bg=theme["button_bg"], fg=theme["fg"])
-        self.sort_date_asc_btn.config(bg=theme["button_bg"], fg=theme["fg"])
-        self.sort_date_desc_btn.config(bg=theme["button_bg"], fg=theme["fg"])
-        
-        # 更新排序按钮样式
-        self.update_sort_buttons()
-        
-        # 更新任务显示以应用完成任务的颜色
-        self.reload_tasks()
+        """
+        应用当前主题
+
+        主题引擎一次遍历已登记的控件；任务列表只重新计算可见行的颜色，
+        文本没有变化的行不会被删除和重新插入。
+        """
+        self.theme.apply(self.current_theme)
+    
+    def import_tasks(self):
+        """从文件导入任务（在后台线程中逐批导入，状态栏显示进度）；正在导入时询问是否取消"""
+        if self.import_job is not None:
+            if messagebox.askyesno("导入", "正在导入任务，是否取消？（已导入的任务会保留）"):
+                self.import_job.cancel()
+            return
+        
+        filename = filedialog.askopenfilename(
+            filetypes=[("任务文件", "*.txt *.csv *.jsonl *.ndjson *.json"), ("文本文件", "*.txt"),
+                       ("CSV文件", "*.csv"), ("JSON Lines", "*.jsonl *.ndjson"), ("JSON文件", "*.json"),
+                       ("所有文件", "*.*")],
+            title="导入任务"
+        )
+        if filename:
+            self.import_job = self.engine.import_file(filename, background=True)
+            self._poll_import()
+    
+    def _poll_import(self):
+        """定时读取导入进度，结束后刷新任务列表并显示结果"""
+        job = self.import_job
+        if not job.done:
+            self.status_label.config(text=f"正在导入... {job.progress:.0%} | 已导入: {job.imported}"
+                                          f"{'（正在取消）' if job.cancelled else ''}")
+            self.root.after(200, self._poll_import)
+            return
+        
+        self.import_job = None
+        self.apply_filter()
+        message = f"已导入 {job.imported} 个任务"
+        if job.skipped:
+            message += f"，跳过 {job.skipped} 行无法识别的内容"
+        if job.invalid_dates:
+            message += f"，{job.invalid_dates} 个任务的截止日期无效（已忽略）"
+        if job.error is not None:
+            messagebox.showerror("错误", f"导入任务失败: {job.error}\n{message}")
+        elif job.cancelled:
+            messagebox.showinfo("导入", f"导入已取消，{message}")
+        else:
+            messagebox.showinfo("成功", message + "！")
     
-    def export_as_text(self):
-        """导出任务为文本文件"""
+    def export_tasks(self):
+        """导出全部任务（在后台线程中写出，状态栏显示进度）；正在导出时询问是否取消"""
+        if self.export_job is not None:
+            if messagebox.askyesno("导出", "正在导出任务，是否取消？"):
+                self.export_job.cancel()
+            return
+        
         filename = filedialog.asksaveasfilename(
             defaultextension=".txt",
-            filetypes=[("文本文件", "*.txt"), ("所有文件", "*.*")],
+            filetypes=[("文本文件", "*.txt"), ("Markdown", "*.md"), ("CSV文件", "*.csv"),
+                       ("JSON Lines", "*.jsonl"), ("JSON文件", "*.json"), ("所有文件", "*.*")],
             title="导出任务列表"
         )
         if filename:
-            if export_tasks_as_text(self.tasks, filename):
-                messagebox.showinfo("成功", "任务已成功导出为文本文件！")
-            else:
-                messagebox.showerror("错误", "导出任务失败！")
+            self.export_job = self.engine.export_file(filename, background=True)
+            self._poll_export()
+    
+    def _poll_export(self):
+        """定时读取导出进度，结束后显示结果"""
+        job = self.export_job
+        if not job.done:
+            self.status_label.config(text=f"正在导出... {job.progress:.0%}"
+                                          f"{'（正在取消）' if job.cancelled else ''}")
+            self.root.after(200, self._poll_export)
+            return
+        
+        self.export_job = None
+        self._update_status()
+        if job.succeeded:
+            messagebox.showinfo("成功", f"已导出 {job.exported} 个任务！")
+        elif job.error is not None:
+            messagebox.showerror("错误", f"导出任务失败: {job.error}")
     
     def backup_data(self):
-        """备份任务数据"""
-        if backup_tasks(self.tasks):
-            messagebox.showinfo("成功", "任务数据已成功备份！")
-        else:
-            messagebox.showerror("错误", "备份任务数据失败！")
+        """备份任务数据（在后台线程中进行）"""
+        self.engine.load_all()
+        
+        def run_backup():
+            try:
+                return True, self.engine.backup()
+            except Exception as e:
+                print(f"备份任务失败: {e}")
+                return False, None
+        
+        def show_result(result):
+            self._update_status()
+            success, name = result
+            if not success:
+                messagebox.showerror("错误", "备份任务数据失败！")
+            elif name is None:
+                messagebox.showinfo("提示", "任务数据与最新的备份相同，无需再次备份。")
+            else:
+                messagebox.showinfo("成功", "任务数据已成功备份！")
+        
+        self.status_label.config(text="正在备份...")
+        self.backup_worker.submit(run_backup, show_result)
+    
+    def restore_backup(self):
+        """选择一个备份并恢复"""
+        backups = self.engine.list_backups()  # 最新的在前
+        if not backups:
+            messagebox.showinfo("提示", "还没有任何备份！")
+            return
+        
+        restore_window = tk.Toplevel(self.root)
+        restore_window.title("恢复备份")
+        restore_window.transient(self.root)
+        restore_window.grab_set()
+        
+        backup_listbox = tk.Listbox(restore_window, width=40, height=10, exportselection=False)
+        backup_listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        for name, count in backups:
+            # 名称形如 tasks_backup_20250410_002907[_微秒][.json]
+            stamp = name[len("tasks_backup_"):].split(".")[0]
+            label = f"{stamp[0:4]}-{stamp[4:6]}-{stamp[6:8]} {stamp[9:11]}:{stamp[11:13]}:{stamp[13:15]}"
+            if count is not None:
+                label += f"  ({count} 个任务)"
+            backup_listbox.insert(tk.END, label)
+        backup_listbox.selection_set(0)
+        
+        def do_restore():
+            selection = backup_listbox.curselection()
+            if not selection:
+                messagebox.showwarning("警告", "请先选择一个备份！", parent=restore_window)
+                return
+            if not messagebox.askyesno("确认", "恢复备份将替换当前的全部任务，是否继续？", parent=restore_window):
+                return
+            try:
+                count, saved = self.engine.restore_backup(backups[selection[0]][0])
+            except Exception as e:
+                messagebox.showerror("错误", f"读取备份失败: {e}", parent=restore_window)
+                return
+            
+            restore_window.destroy()
+            self.apply_filter()
+            if saved:
+                messagebox.showinfo("成功", f"已恢复 {count} 个任务！")
+            else:
+                messagebox.showerror("错误", "恢复的任务保存失败！")
+        
+        restore_button = tk.Button(restore_window, text="恢复", command=do_restore, width=10)
+        restore_button.pack(pady=(0, 10))
+        backup_listbox.bind("<Double-1>", lambda event: do_restore())
     
     def open_settings(self):
         """打开设置对话框"""
         settings_window = tk.Toplevel(self.root)
         settings_window.title("设置")
-        settings_window.geometry("300x200")
+        settings_window.geometry("300x260")
         settings_window.resizable(False, False)
         
         # 使设置窗口在父窗口上居中
         x = self.root.winfo_x() + (self.root.winfo_width() - 300) // 2
-        y = self.root.winfo_y() + (self.root.winfo_height() - 200) // 2
+        y = self.root.winfo_y() + (self.root.winfo_height() - 260) // 2
         settings_window.geometry(f"+{x}+{y}")
         
         # 防止与主窗口交互直到关闭设置窗口
@@ -609,15 +821,25 @@ class ToDoAppUI:
         theme_dark = tk.Radiobutton(settings_frame, text="深色主题", variable=theme_var, value="dark")
         theme_dark.pack(anchor="w", padx=20, pady=(0, 10))
         
+        # 字体大小设置
+        font_frame = tk.Frame(settings_frame)
+        font_frame.pack(fill=tk.X)
+        font_label = tk.Label(font_frame, text="字体大小:", anchor="w")
+        font_label.pack(side=tk.LEFT)
+        font_var = tk.IntVar(value=self.settings["font_size"])
+        font_spinbox = tk.Spinbox(font_frame, from_=8, to=20, textvariable=font_var, width=5, state="readonly")
+        font_spinbox.pack(side=tk.LEFT, padx=5)
+        
         # 自动备份设置
-        backup_var = tk.BooleanVar(value=False)
-        backup_check = tk.Checkbutton(settings_frame, text="退出时自动备份", variable=backup_var)
+        backup_var = tk.BooleanVar(value=self.settings["auto_backup"])
+        backup_check = tk.Checkbutton(settings_frame, text="自动备份（定时及退出时）", variable=backup_var)
         backup_check.pack(anchor="w", pady=(10, 5))
         
-        # 确定按钮
+        # 确定按钮：修改配置后由订阅者更新界面
         def save_settings():
-            self.current_theme = theme_var.get()
-            self.apply_theme()
+            self.settings.set("theme", theme_var.get())
+            self.settings.set("font_size", font_var.get())
+            self.settings.set("auto_backup", backup_var.get())
             settings_window.destroy()
         
         save_button = tk.Button(settings_frame, text="确定", command=save_settings, width=10)
@@ -696,117 +918,119 @@ class ToDoAppUI:
         button_frame = tk.Frame(search_window)
         button_frame.pack(fill=tk.X, padx=10, pady=10)
         
+        # 搜索结果对应的任务 id，与 result_listbox 的行一一对应
+        result_ids = []
+        
+        # 边输入边搜索：停止输入一段时间后才开始查询，查询在后台线程中执行
+        debounce_ms = self.settings["search_debounce_ms"]
+        page_size = 200  # 每次向结果列表插入的行数
+        worker = QueryWorker(search_window)
+        pending = [None]  # 等待触发的 after 任务
+        last_query = [None]  # 最近一次安排或执行的查询条件
+        
+        def current_query():
+            return search_entry.get().strip(), scope_var.get(), case_sensitive_var.get()
+        
+        def schedule_search(event=None):
+            """查询条件变化时取消正在进行的查询，并在防抖时间后重新查询"""
+            if event is not None and event.keysym == "Return":
+                return
+            # 方向键、Shift、Tab 等不改变查询条件的按键不重新查询
+            query = current_query()
+            if query == last_query[0]:
+                return
+            last_query[0] = query
+            worker.cancel()
+            if pending[0] is not None:
+                search_window.after_cancel(pending[0])
+            pending[0] = search_window.after(debounce_ms, perform_search)
+        
         # 搜索函数
         def perform_search():
-            keyword = search_entry.get().strip()
-            if not keyword:
-                return
+            if pending[0] is not None:
+                search_window.after_cancel(pending[0])
+                pending[0] = None
+            worker.cancel()
             
             # 清空之前的结果
             result_listbox.delete(0, tk.END)
+            del result_ids[:]
             
-            # 搜索逻辑
-            scope = scope_var.get()
-            case_sensitive = case_sensitive_var.get()
+            last_query[0] = current_query()
+            keyword, scope, case_sensitive = last_query[0]
+            if not keyword:
+                status_label.config(text="")
+                return
             
             # 确定要搜索的任务范围
-            if scope == "all":
-                search_tasks = self.tasks
-            elif scope == "active":
-                search_tasks = [t for t in self.tasks if not t.get("completed", False)]
-            else:  # completed
-                search_tasks = [t for t in self.tasks if t.get("completed", False)]
+            completed = {"all": None, "active": False, "completed": True}[scope]
             
-            # 执行搜索
-            results = []
-            for task in search_tasks:
-                task_text = task.get("text", "")
-                if not case_sensitive:
-                    if keyword.lower() in task_text.lower():
-                        results.append(task)
-                else:
-                    if keyword in task_text:
-                        results.append(task)
-            
-            # 显示结果
-            if results:
-                for task in results:
-                    priority = task.get("priority", "中")
-                    completed = task.get("completed", False)
-                    text = task.get("text", "")
-                    due_date = task.get("due_date", "")
-                    
-                    display_text = f"[{priority}] {text}"
-                    if due_date:
-                        display_text += f" (截止: {due_date})"
-                    if completed:
-                        display_text = f"✓ {display_text}"
-                    
-                    result_listbox.insert(tk.END, display_text)
-                    
-                    # 设置完成任务的样式
-                    if completed:
-                        idx = result_listbox.size() - 1
-                        result_listbox.itemconfig(idx, fg="gray")
-                
-                status_label.config(text=f"找到 {len(results)} 个匹配项")
-            else:
+            # 在后台通过倒排索引执行搜索，被新的输入取代时提前结束
+            status_label.config(text="正在查找...")
+            generation = worker.submit(
+                lambda: self.engine.search(keyword, completed=completed, case_sensitive=case_sensitive,
+                                           cancelled=worker.stale),
+                lambda results: show_results(results, generation))
+        
+        def show_results(results, generation):
+            """分页把结果插入列表，每页之间让出事件循环，不阻塞输入"""
+            if not results:
                 result_listbox.insert(tk.END, "没有找到匹配的任务")
                 status_label.config(text="没有找到匹配的任务")
+                return
+            
+            status_label.config(text=f"找到 {len(results)} 个匹配项")
+            result_ids.extend(task.id for task in results)
+            
+            def insert_page(start):
+                # 有新的输入时停止插入旧结果
+                if not worker.is_current(generation):
+                    return
+                page = results[start:start + page_size]
+                result_listbox.insert(tk.END, *[self._format_task(task) for task in page])
+                
+                # 设置完成任务的样式
+                for offset, task in enumerate(page):
+                    if task.completed:
+                        result_listbox.itemconfig(start + offset, fg="gray")
+                
+                if start + page_size < len(results):
+                    search_window.after(1, insert_page, start + page_size)
+            
+            insert_page(0)
         
         # 跳转到任务
         def go_to_task():
             try:
                 selected_idx = result_listbox.curselection()[0]
-                # 获取显示文本，从中提取任务信息
-                display_text = result_listbox.get(selected_idx)
+                task = self.engine.get(result_ids[selected_idx])
+                if task is None:
+                    return
                 
-                # 在主任务列表中查找匹配的任务
-                for i, task in enumerate(self.tasks):
-                    priority = task.get("priority", "中")
-                    completed = task.get("completed", False)
-                    text = task.get("text", "")
-                    due_date = task.get("due_date", "")
-                    
-                    task_display = f"[{priority}] {text}"
-                    if due_date:
-                        task_display += f" (截止: {due_date})"
-                    if completed:
-                        task_display = f"✓ {task_display}"
+                # 应用"全部"过滤以显示所有任务
+                self.filter_var.set("全部")
+                self.apply_filter()
+                
+                # 按 id 查找在过滤后列表中的位置
+                filtered_idx = next((i for i, t in enumerate(self.filtered_tasks) if t.id == task.id), None)
+                if filtered_idx is None:
+                    return
+                
+                # 选中该任务
+                self.task_list.see(filtered_idx)  # 确保可见
+                self.task_list.selection_set(filtered_idx)
+                
+                # 将任务信息填充到编辑区域
+                self.entry.delete(0, tk.END)
+                self.entry.insert(0, task.text)
+                self.priority_var.set(task.priority)
+                
+                if task.due != NO_DUE:
+                    self.date_picker.set_date(datetime.date.fromordinal(task.due))
+                else:
+                    self.date_picker.set_date(datetime.date.today())
                     
-                    # 如果找到匹配任务
-                    if task_display == display_text:
-                        # 应用"全部"过滤以显示所有任务
-                        self.filter_var.set("全部")
-                        self.apply_filter()
-                        
-                        # 查找在过滤后列表中的位置
-                        try:
-                            filtered_idx = self.filtered_tasks.index(task)
-                            # 选中该任务
-                            self.listbox.selection_clear(0, tk.END)
-                            self.listbox.selection_set(filtered_idx)
-                            self.listbox.see(filtered_idx)  # 确保可见
-                            
-                            # 将任务信息填充到编辑区域
-                            self.entry.delete(0, tk.END)
-                            self.entry.insert(0, task["text"])
-                            self.priority_var.set(task["priority"])
-                            
-                            if task.get("due_date"):
-                                try:
-                                    due_date = datetime.datetime.strptime(task["due_date"], "%Y-%m-%d").date()
-                                    self.date_picker.set_date(due_date)
-                                except:
-                                    pass
-                            else:
-                                self.date_picker.set_date(datetime.date.today())
-                                
-                            search_window.destroy()
-                            break
-                        except ValueError:
-                            # 任务不在过滤列表中
-                            pass
+                search_window.destroy()
             except IndexError:
                 pass
         
@@ -831,21 +1055,15 @@ class ToDoAppUI:
         
         # 绑定回车键
         search_entry.bind("<Return>", lambda e: perform_search())
-        
-        # 应用当前主题
-        theme = self.theme_color[self.current_theme]
-        search_window.configure(bg=theme["bg"])
-        search_frame.configure(bg=theme["bg"])
-        options_frame.configure(bg=theme["bg"])
-        results_frame.configure(bg=theme["bg"])
-        button_frame.configure(bg=theme["bg"])
-        
-        search_label.configure(bg=theme["bg"], fg=theme["fg"])
-        search_scope_label.configure(bg=theme["bg"], fg=theme["fg"])
-        scope_all.configure(bg=theme["bg"], fg=theme["fg"], selectcolor=theme["button_bg"])
-        scope_active.configure(bg=theme["bg"], fg=theme["fg"], selectcolor=theme["button_bg"])
-        scope_completed.configure(bg=theme["bg"], fg=theme["fg"], selectcolor=theme["button_bg"])
-        case_sensitive_check.configure(bg=theme["bg"], fg=theme["fg"], selectcolor=theme["button_bg"])
-        status_label.configure(bg=theme["bg"], fg=theme["fg"])
-        
-        result_listbox.configure(bg=theme["listbox_bg"], fg=theme["fg"])
\ No newline at end of file
+        search_entry.bind("<KeyRelease>", schedule_search)
+        for option in (scope_all, scope_active, scope_completed, case_sensitive_check):
+            option.config(command=schedule_search)
+        
+        # 关闭窗口时结束后台查询
+        search_window.bind("<Destroy>", lambda e: worker.close() if e.widget is search_window else None)
+        
+        # 登记到主题引擎，窗口打开期间切换主题也会更新
+        self.theme.register(FRAME, search_window, search_frame, options_frame, results_frame, button_frame)
+        self.theme.register(LABEL, search_label, search_scope_label, status_label)
+        self.theme.register(OPTION, scope_all, scope_active, scope_completed, case_sensitive_check)
+        self.theme.register(LISTBOX, result_listbox)
\ No newline at end of file
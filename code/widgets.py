@@ -0,0 +1,199 @@
+﻿# widgets.py
+import difflib
+import tkinter as tk
+import tkinter.font as tkfont
+from perf import timed
+
+class VirtualListbox(tk.Frame):
+    """
+    虚拟列表控件：只把窗口中可见的几行插入到 Tk 列表框中
+
+    数据保存在普通的 Python 序列中（items），滚动时根据滚动位置计算出
+    首行在数据中的位置，再重新渲染可见的行。刷新的代价只与窗口高度有关，
+    与数据条数无关。
+
+    渲染时把新的可见行与上一次渲染的结果按 row_key 做差异比较，
+    只对 Tk 发出必要的 insert、delete 和 itemconfig 调用。
+
+    参数:
+    - format_row: 将数据项转换为显示文本的函数
+    - row_color: 返回数据项前景色的函数，返回 None 表示使用默认颜色
+    - row_key: 返回数据项唯一标识的函数，默认使用对象本身的 id
+    - 其余参数直接传给内部的 tk.Listbox
+    """
+
+    def __init__(self, master, format_row, row_color=None, row_key=id, **listbox_options):
+        tk.Frame.__init__(self, master)
+        self.format_row = format_row
+        self.row_color = row_color
+        self.row_key = row_key
+
+        self.items = []
+        self._top = 0  # 可见区域第一行在数据中的位置
+        self._rows = 1  # 可见区域能容纳的行数
+        self._selected = None  # 选中行在数据中的位置
+        self._rendered = []  # 列表框中当前各行的 (标识, 文本, 颜色)
+
+        self.scrollbar = tk.Scrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.listbox = tk.Listbox(self, exportselection=False, **listbox_options)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.listbox.bind("<Configure>", self._on_resize)
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<MouseWheel>", self._on_mousewheel)
+        self.listbox.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.listbox.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.listbox.bind("<Up>", lambda e: self._move_selection(-1))
+        self.listbox.bind("<Down>", lambda e: self._move_selection(1))
+        self.listbox.bind("<Prior>", lambda e: self._move_selection(-self._rows))
+        self.listbox.bind("<Next>", lambda e: self._move_selection(self._rows))
+
+    def set_items(self, items):
+        """替换数据并刷新显示，保留当前滚动位置"""
+        self.items = items
+        self._selected = None
+        self.refresh()
+
+    def refresh(self):
+        """数据被原地修改后重新渲染可见行"""
+        if self._selected is not None and self._selected >= len(self.items):
+            self._selected = None
+        self._top = self._clamp_top(self._top)
+        self._render()
+
+    def size(self):
+        return len(self.items)
+
+    def curselection(self):
+        """返回选中行在数据中的位置，与 tk.Listbox.curselection 的格式相同"""
+        if self._selected is None:
+            return ()
+        return (self._selected,)
+
+    def selection_set(self, index):
+        self._selected = index
+        self._render()
+
+    def selection_clear(self):
+        self._selected = None
+        self.listbox.selection_clear(0, tk.END)
+
+    def see(self, index):
+        """滚动使第 index 行可见"""
+        if index < self._top:
+            self._top = index
+        elif index >= self._top + self._rows:
+            self._top = index - self._rows + 1
+        self._top = self._clamp_top(self._top)
+        self._render()
+
+    def _clamp_top(self, top):
+        return max(0, min(top, len(self.items) - self._rows))
+
+    @timed("ui.render_list")
+    def _render(self):
+        """把可见区域的数据行同步到列表框，并同步滚动条和选中状态"""
+        end = min(self._top + self._rows, len(self.items))
+        rows = []
+        for item in self.items[self._top:end]:
+            color = self.row_color(item) if self.row_color else None
+            rows.append((self.row_key(item), self.format_row(item), color))
+
+        self._reconcile(rows)
+
+        listbox = self.listbox
+        listbox.selection_clear(0, tk.END)
+        if self._selected is not None and self._top <= self._selected < end:
+            listbox.selection_set(self._selected - self._top)
+
+        total = len(self.items)
+        if total:
+            self.scrollbar.set(self._top / total, end / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _reconcile(self, rows):
+        """比较新旧可见行，只把有变化的行写入列表框"""
+        listbox = self.listbox
+        old = self._rendered
+        matcher = difflib.SequenceMatcher(None, [row[0] for row in old], [row[0] for row in rows], autojunk=False)
+
+        # 从后往前应用，前面的行号在处理过程中保持不变
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag == "equal":
+                for offset in range(i2 - i1):
+                    _, old_text, old_color = old[i1 + offset]
+                    _, text, color = rows[j1 + offset]
+                    if text != old_text:
+                        listbox.delete(i1 + offset)
+                        listbox.insert(i1 + offset, text)
+                        if color:
+                            listbox.itemconfig(i1 + offset, fg=color)
+                    elif color != old_color:
+                        listbox.itemconfig(i1 + offset, fg=color or "")
+                continue
+
+            if i2 > i1:
+                listbox.delete(i1, i2 - 1)
+            if j2 > j1:
+                listbox.insert(i1, *[row[1] for row in rows[j1:j2]])
+                for offset, (_, _, color) in enumerate(rows[j1:j2]):
+                    if color:
+                        listbox.itemconfig(i1 + offset, fg=color)
+
+        self._rendered = rows
+
+    def _row_height(self):
+        font = tkfont.Font(font=self.listbox.cget("font"))
+        return font.metrics("linespace") + 1 + 2 * int(self.listbox.cget("selectborderwidth"))
+
+    def _on_resize(self, event):
+        border = 2 * (int(self.listbox.cget("borderwidth")) + int(self.listbox.cget("highlightthickness")))
+        rows = max(1, -(-(event.height - border) // self._row_height()))
+        if rows != self._rows:
+            self._rows = rows
+            self.refresh()
+
+    def _on_select(self, event):
+        selection = self.listbox.curselection()
+        if selection:
+            self._selected = self._top + selection[0]
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * len(self.items)))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self._rows
+            self._scroll_by(step)
+
+    def _on_mousewheel(self, event):
+        # Windows 上每格 delta 为 120，macOS 上为较小的整数
+        step = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self._scroll_by(-3 * step)
+        return "break"
+
+    def _scroll_by(self, rows):
+        self._scroll_to(self._top + rows)
+        return "break"
+
+    def _scroll_to(self, top):
+        top = self._clamp_top(top)
+        if top != self._top:
+            self._top = top
+            self._render()
+
+    def _move_selection(self, step):
+        if not self.items:
+            return "break"
+        if self._selected is None:
+            index = self._top
+        else:
+            index = max(0, min(self._selected + step, len(self.items) - 1))
+        self._selected = index
+        self.see(index)
+        self.listbox.event_generate("<<ListboxSelect>>")
+        return "break"
@@ -0,0 +1,203 @@
+﻿# workers.py
+import queue
+import threading
+import time
+from perf import record, count
+
+class QueryWorker:
+    """
+    后台查询线程
+
+    submit() 提交的查询在工作线程中执行，结果通过 Tk 的 after 轮询交回主线程，
+    回调总是在主线程中调用。新的查询提交后，尚未执行或已执行完但未交付的旧查询
+    都会被丢弃，回调只会收到最新一次查询的结果。
+
+    正在执行的查询不会被强行中断：查询函数可以调用 stale() 判断自己是否已被取消，
+    及早结束（例如 TaskStore.query 的 cancelled 参数），否则它会执行完，只是结果被丢弃。
+    """
+
+    def __init__(self, widget, poll_ms=15):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.generation = 0
+
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._waiting = None  # 正在等待结果的查询编号
+        self._running = None  # 工作线程正在执行的查询编号
+        self._polling = False
+        self._thread = threading.Thread(target=self._run, name="QueryWorker", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, callback):
+        """在后台执行 func()，完成后在主线程中调用 callback(结果)，返回本次查询的编号"""
+        self.generation += 1
+        self._requests.put((self.generation, func, callback))
+        self._waiting = self.generation
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+        return self.generation
+
+    def cancel(self):
+        """丢弃所有尚未交付的查询（正在执行的查询见 stale()）"""
+        self.generation += 1
+        self._waiting = None
+
+    def is_current(self, generation):
+        """判断编号为 generation 的查询是否仍是最新的"""
+        return generation == self.generation
+
+    def stale(self):
+        """在查询函数中调用：正在执行的查询是否已被取消或被更新的查询取代"""
+        return self._running != self.generation
+
+    def close(self):
+        """取消查询并结束工作线程"""
+        self.cancel()
+        self._requests.put(None)
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            # 只执行积压请求中最新的一个
+            while request is not None and not self._requests.empty():
+                request = self._requests.get()
+            if request is None:
+                return
+
+            generation, func, callback = request
+            if generation != self.generation:
+                continue
+            self._running = generation
+            try:
+                result = func()
+            except Exception as e:
+                print(f"后台查询失败: {e}")
+                callback = None
+                result = None
+            self._running = None
+            self._results.put((generation, result, callback))
+
+    def _poll(self):
+        try:
+            while True:
+                generation, result, callback = self._results.get_nowait()
+                if generation == self._waiting:
+                    self._waiting = None
+                    if callback is not None:
+                        callback(result)
+        except queue.Empty:
+            pass
+
+        # 最新的查询还没有结果时继续轮询
+        if self._waiting is not None:
+            self.widget.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+class SaveWorker:
+    """
+    后台保存线程
+
+    主线程通过 submit() 提交日志记录后立即返回。工作线程收到第一条记录后再等待
+    一小段时间（debounce 秒），把这段时间内的连续修改合并（coalesce）后一次写入
+    storage.write_records()；持续有修改时，最迟 max_delay 秒也会写一次。
+
+    stats() 返回排队记录数和写入耗时，用于判断磁盘 I/O 是否成为瓶颈。
+    """
+
+    def __init__(self, storage, coalesce=None, debounce=0.2, max_delay=1.0):
+        self.storage = storage
+        self.coalesce = coalesce
+        self.debounce = debounce
+        self.max_delay = max_delay
+
+        self._queue = queue.Queue()
+        self._collecting = 0  # 已从队列取出、尚未写入的记录数
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "records": 0, "written": 0,
+                       "last_latency_ms": 0.0, "max_latency_ms": 0.0, "total_latency_ms": 0.0}
+        self._thread = threading.Thread(target=self._run, name="SaveWorker", daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        """提交一条日志记录"""
+        self._queue.put(record)
+
+    def flush(self, timeout=None):
+        """立即写入所有已提交的记录并等待完成，返回是否在超时前完成"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """写入剩余记录并结束工作线程"""
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self):
+        """
+        返回写入统计:
+        - queue_depth: 尚未写入的记录数
+        - batches / records / written: 写入次数、提交的记录数、合并后实际写入的记录数
+        - last_latency_ms / max_latency_ms / avg_latency_ms: 每次写入的耗时
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize() + self._collecting
+        stats["avg_latency_ms"] = stats.pop("total_latency_ms") / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = []
+            waiters = []
+            deadline = time.monotonic() + self.max_delay
+            while True:
+                if item is None:
+                    self._queue.put(None)  # 写完这一批再退出
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                self._collecting = len(batch)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=min(self.debounce, remaining))
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(batch)
+            self._collecting = 0
+            for waiter in waiters:
+                waiter.set()
+
+    def _write(self, batch):
+        records = self.coalesce(batch) if self.coalesce else batch
+        start = time.perf_counter()
+        try:
+            self.storage.write_records(records)
+        except Exception as e:
+            print(f"保存任务失败: {e}")
+        latency = (time.perf_counter() - start) * 1000
+        record("storage.write", latency)
+        count("storage.records_written", len(records))
+
+        with self._lock:
+            stats = self._stats
+            stats["batches"] += 1
+            stats["records"] += len(batch)
+            stats["written"] += len(records)
+            stats["last_latency_ms"] = latency
+            stats["max_latency_ms"] = max(stats["max_latency_ms"], latency)
+            stats["total_latency_ms"] += latency